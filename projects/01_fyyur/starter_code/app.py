@@ -3,18 +3,32 @@
 #----------------------------------------------------------------------------#
 
 import json
+import functools
 import dateutil.parser
-import babel
-from flask import Flask, render_template, request, Response, flash, redirect, url_for
+import babel.dates
+from flask import Flask, render_template, request, Response, flash, redirect, url_for, abort, stream_with_context, jsonify, g, has_request_context
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 import logging
 from logging import Formatter, FileHandler
 from flask_wtf import Form
 from flask_migrate import Migrate
 from forms import *
-import sys
+from search import NameIndex
+from cache import ResponseCache
+from dbpool import instrument_pool, pool_stats
+from metrics import RequestMetrics
+from asyncdb import AsyncReader
+import time
+import threading
+import click
+from flask.cli import AppGroup
+from importer import FORMATS, guess_format, read_records, run_import, text_stream
+import generator
+from itertools import islice
 #----------------------------------------------------------------------------#
 # App Config.
 #----------------------------------------------------------------------------#
@@ -22,16 +36,60 @@ import sys
 app = Flask(__name__)
 moment = Moment(app)
 app.config.from_object('config')
-db = SQLAlchemy(app)
+# the session lives for one request and is removed by Flask-SQLAlchemy at
+# teardown; committed objects stay readable without a reload (see config)
+db = SQLAlchemy(app, session_options={'expire_on_commit': app.config['SQLALCHEMY_EXPIRE_ON_COMMIT']})
+
+@app.before_request
+def instrument_db_pool():
+  # checkout counters and hold times for /pool/stats; attached on the first
+  # request rather than at import, which would create the engine early
+  # (later calls return at once)
+  instrument_pool(db.engine)
 
 # connect to a local postgresql database
 migrate = Migrate(app, db)
+# cache of the read-only pages, invalidated by the write handlers
+cache = ResponseCache(app)
+# per-request wall time, SQL statement count/time and template time, logged as
+# JSON lines on the 'fyyur.requests' logger and exported at /metrics
+metrics = RequestMetrics(app)
+# optional concurrent read path for the detail pages, see asyncdb.py
+async_reads = AsyncReader(app.config['SQLALCHEMY_DATABASE_URI'], app.config['SQLALCHEMY_ENGINE_OPTIONS']) \
+  if app.config['ASYNC_READS'] else None
+# every cached page that shows venue, artist or show data
+LISTING_PAGES = ('venues', 'venues_by_genre', 'show_venue', 'artists', 'artists_by_genre', 'show_artist', 'shows')
+
+# cursor format for keyset pagination of /shows, keeps microseconds
+SHOW_CURSOR_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
 #----------------------------------------------------------------------------#
 # Models.
 #----------------------------------------------------------------------------#
 
+class Genre(db.Model):
+    __tablename__ = 'Genre'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+# genres of venues and artists, indexed by genre for the genre filters
+venue_genres = db.Table('venue_genres',
+    db.Column('venue_id', db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_venue_genres_genre_id', 'genre_id')
+)
+
+artist_genres = db.Table('artist_genres',
+    db.Column('artist_id', db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('genre_id', db.Integer, db.ForeignKey('Genre.id'), primary_key=True),
+    db.Index('ix_artist_genres_genre_id', 'genre_id')
+)
+
 class Venue(db.Model):
     __tablename__ = 'Venue'
+    __table_args__ = (
+        db.UniqueConstraint('name', name='uq_Venue_name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
@@ -42,49 +100,636 @@ class Venue(db.Model):
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=venue_genres, lazy=True)
     seeking_talent = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='venues', lazy=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    shows = db.relationship('Show', backref='venues', lazy=True, passive_deletes=True)
 
 class Artist(db.Model):
     __tablename__ = 'Artist'
+    __table_args__ = (
+        db.UniqueConstraint('name', name='uq_Artist_name'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String)
     city = db.Column(db.String(120))
     state = db.Column(db.String(120))
     phone = db.Column(db.String(120))
-    genres = db.Column(db.String(120))
+    genres = db.relationship('Genre', secondary=artist_genres, lazy=True)
     image_link = db.Column(db.String(500))
     facebook_link = db.Column(db.String(120))
     website = db.Column(db.String(120))
     seeking_venue = db.Column(db.Boolean)
     seeking_description = db.Column(db.String(500))
-    shows = db.relationship('Show', backref='artists', lazy=True)
+    upcoming_shows_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    shows = db.relationship('Show', backref='artists', lazy=True, passive_deletes=True)
 
 class Show(db.Model):
     __tablename__ = "Show"
+    __table_args__ = (
+        db.UniqueConstraint('venue_id', 'artist_id', 'start_time', name='uq_Show_venue_id_artist_id_start_time'),
+        db.Index('ix_Show_venue_id_start_time', 'venue_id', 'start_time'),
+        db.Index('ix_Show_artist_id_start_time', 'artist_id', 'start_time'),
+        db.Index('ix_Show_start_time_id', 'start_time', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     start_time = db.Column(db.DateTime)
-    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id'), nullable=False)
-    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id'), nullable=False)
+    venue_id = db.Column(db.Integer, db.ForeignKey('Venue.id', ondelete='CASCADE'), nullable=False)
+    artist_id = db.Column(db.Integer, db.ForeignKey('Artist.id', ondelete='CASCADE'), nullable=False)
+
+class CounterWatermark(db.Model):
+    # when upcoming_shows_count was last brought up to date (a full recount or
+    # advance_upcoming_show_counts()): the counters hold the shows starting
+    # after counted_at. A single row, id 1, inserted with the table
+    __tablename__ = 'CounterWatermark'
+
+    id = db.Column(db.Integer, primary_key=True)
+    counted_at = db.Column(db.DateTime, nullable=False)
+
+@db.event.listens_for(CounterWatermark.__table__, 'after_create')
+def insert_counter_watermark(table, connection, **kwargs):
+  # a new schema has no shows yet, so the counters are up to date from now
+  connection.execute(table.insert(), {'id': 1, 'counted_at': datetime.now()})
+
+#----------------------------------------------------------------------------#
+# Queries.
+#----------------------------------------------------------------------------#
+
+def is_unique_violation(error):
+  # psycopg2 reports SQLSTATE 23505, SQLite only says so in the message
+  return getattr(error.orig, 'pgcode', None) == '23505' or 'UNIQUE constraint failed' in str(error.orig)
+
+def request_time():
+  # one clock reading per request, shared by every view and query helper so
+  # that the counters and the past/upcoming split of a page agree
+  if not has_request_context():
+    return datetime.now()
+  if 'request_time' not in g:
+    g.request_time = datetime.now()
+  return g.request_time
+
+def is_upcoming(start_time, current_time):
+  # the one rule used everywhere: a show is upcoming until it starts
+  return start_time > current_time
+
+def upcoming(current_time):
+  # is_upcoming() as a SQL condition on Show
+  return Show.start_time > current_time
+
+def counter_watermark():
+  # the time the stored counters count from, read by the writes that adjust
+  # them. The row is share-locked until the write commits, so that
+  # advance_upcoming_show_counts() cannot move it in between. A database
+  # without the row (tables created before it was inserted with them) gets it
+  # now; until then the reads had nothing to subtract.
+  counted_at = db.session.query(CounterWatermark.counted_at).filter(CounterWatermark.id == 1) \
+    .with_for_update(read=True).scalar()
+  if counted_at is None:
+    counted_at = request_time()
+    try:
+      with db.session.begin_nested():
+        db.session.add(CounterWatermark(id=1, counted_at=counted_at))
+    except IntegrityError:
+      # inserted by a concurrent write
+      counted_at = db.session.query(CounterWatermark.counted_at).filter(CounterWatermark.id == 1).scalar()
+  return counted_at
+
+def recount_upcoming_shows(model, counted_at, ids=None):
+  # recompute the denormalised counter of venues or artists (all of them, or
+  # only the given ids) with one correlated UPDATE statement
+  owner_id = Show.venue_id if model is Venue else Show.artist_id
+  count = db.session.query(func.count(Show.id)) \
+    .filter(owner_id == model.id) \
+    .filter(upcoming(counted_at)) \
+    .correlate(model).scalar_subquery()
+  query = db.session.query(model)
+  if ids is not None:
+    query = query.filter(model.id.in_(ids))
+  query.update({model.upcoming_shows_count: count}, synchronize_session=False)
+
+def refresh_upcoming_show_counts(current_time):
+  # recount every counter from the current time and move the watermark there;
+  # run by `flask refresh-show-counts` and the data generator, never by a
+  # request
+  recount_upcoming_shows(Venue, current_time)
+  recount_upcoming_shows(Artist, current_time)
+  watermark = db.session.get(CounterWatermark, 1)
+  if watermark is None:
+    db.session.add(CounterWatermark(id=1, counted_at=current_time))
+  else:
+    watermark.counted_at = current_time
+  db.session.commit()
+  cache.invalidate('venues', 'venues_by_genre', 'artists_by_genre')
+
+def advance_upcoming_show_counts(current_time):
+  # move the watermark to current_time and take the shows that started in
+  # between off the counters of their venues and artists; only those rows are
+  # written, not every counter as in the full recount. The watermark moves with
+  # a conditional UPDATE, so when several processes advance at once only one of
+  # them applies the window. Returns whether this call moved it.
+  counted_at = db.session.query(CounterWatermark.counted_at).filter(CounterWatermark.id == 1).scalar()
+  if counted_at is None:
+    counter_watermark()
+    db.session.commit()
+    return False
+  if current_time <= counted_at:
+    db.session.rollback()
+    return False
+  moved = db.session.query(CounterWatermark) \
+    .filter(CounterWatermark.id == 1, CounterWatermark.counted_at == counted_at) \
+    .update({CounterWatermark.counted_at: current_time}, synchronize_session=False)
+  if not moved:
+    db.session.rollback()
+    return False
+  for model, owner_id in ((Venue, Show.venue_id), (Artist, Show.artist_id)):
+    started = db.session.query(owner_id, func.count(Show.id)) \
+      .filter(Show.start_time > counted_at) \
+      .filter(db.not_(upcoming(current_time))) \
+      .group_by(owner_id).all()
+    # one UPDATE per distinct number of started shows
+    by_count = {}
+    for owner, count in started:
+      by_count.setdefault(count, []).append(owner)
+    for count, ids in by_count.items():
+      db.session.query(model).filter(model.id.in_(ids)) \
+        .update({model.upcoming_shows_count: model.upcoming_shows_count - count}, synchronize_session=False)
+  db.session.commit()
+  cache.invalidate('venues', 'venues_by_genre', 'artists_by_genre')
+  return True
+
+def advance_counters_periodically(interval):
+  # body of the counter thread of each process: advances the watermark every
+  # interval seconds, so that the reads never subtract more than about that
+  # window of started shows, with or without `flask refresh-show-counts`
+  while True:
+    time.sleep(interval)
+    with app.app_context():
+      try:
+        advance_upcoming_show_counts(datetime.now())
+      except Exception:
+        db.session.rollback()
+        app.logger.exception('advancing the upcoming show counters failed')
+      finally:
+        db.session.remove()
+
+counter_thread_lock = threading.Lock()
+counter_thread = None
+
+def start_counter_thread():
+  # started by the first request of a process (after a pre-forking server such
+  # as gunicorn has forked it); COUNTER_ADVANCE_SECONDS = 0 disables it
+  global counter_thread
+  interval = app.config['COUNTER_ADVANCE_SECONDS']
+  if counter_thread is not None or not interval:
+    return
+  with counter_thread_lock:
+    if counter_thread is None:
+      counter_thread = threading.Thread(target=advance_counters_periodically, args=(interval,),
+                                        name='upcoming-show-counters', daemon=True)
+      counter_thread.start()
+
+app.before_request(start_counter_thread)
+
+def started_since_count(model, current_time, ids=None):
+  # {venue/artist id: shows still in its stored counter that have started by
+  # now}, read from the shows between the watermark and the current time only
+  # (ix_Show_start_time_id); the reads subtract it instead of writing counters
+  owner_id = Show.venue_id if model is Venue else Show.artist_id
+  counted_at = db.session.query(CounterWatermark.counted_at) \
+    .filter(CounterWatermark.id == 1).scalar_subquery()
+  query = db.session.query(owner_id, func.count(Show.id)) \
+    .filter(Show.start_time > counted_at) \
+    .filter(db.not_(upcoming(current_time)))
+  if ids is not None:
+    if not ids:
+      return {}
+    query = query.filter(owner_id.in_(ids))
+  return dict(query.group_by(owner_id).all())
+
+def count_new_show(start_time, venue_id, artist_id):
+  # bump the counters for a show being added in the current transaction
+  if not is_upcoming(start_time, counter_watermark()):
+    return
+  db.session.query(Venue).filter(Venue.id == venue_id) \
+    .update({Venue.upcoming_shows_count: Venue.upcoming_shows_count + 1}, synchronize_session=False)
+  db.session.query(Artist).filter(Artist.id == artist_id) \
+    .update({Artist.upcoming_shows_count: Artist.upcoming_shows_count + 1}, synchronize_session=False)
+
+# in-process name indexes for databases without trigram support, built on first use
+name_indexes = {}
+
+def name_index(model):
+  index = name_indexes.get(model)
+  if index is None:
+    index = NameIndex()
+    for item_id, name in db.session.query(model.id, model.name):
+      index.add(item_id, name)
+    name_indexes[model] = index
+  return index
+
+def reindex_name(model, item_id, name=None):
+  # keep a built index in step with a committed create/edit (name) or delete
+  index = name_indexes.get(model)
+  if index is None:
+    return
+  if name is None:
+    index.discard(item_id)
+  else:
+    index.add(item_id, name)
+
+def search_by_name(model, search_term, limit, offset=0):
+  # case-insensitive partial name match as (id, name, upcoming_shows_count)
+  # rows, best matches first and at most limit results: pg_trgm index and
+  # similarity() on PostgreSQL, in-process index elsewhere
+  columns = (model.id, model.name, model.upcoming_shows_count)
+  if db.engine.dialect.name == 'postgresql':
+    pattern = '%{}%'.format(search_term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_'))
+    return db.session.query(*columns).filter(model.name.ilike(pattern, escape='\\')) \
+      .order_by(func.similarity(model.name, search_term).desc(), model.id) \
+      .offset(offset).limit(limit).all()
+  ids = name_index(model).search(search_term, offset + limit)[offset:]
+  if not ids:
+    return []
+  found = {row.id: row for row in db.session.query(*columns).filter(model.id.in_(ids))}
+  return [found[item_id] for item_id in ids if item_id in found]
+
+def page_args():
+  # opt-in paging of list and search pages with ?page=&per_page=: returns
+  # (offset, per_page), or None when no page was asked for
+  page = request.args.get('page', type=int)
+  if page is None:
+    return None
+  per_page = request.args.get('per_page', app.config['LISTING_PER_PAGE'], type=int)
+  per_page = max(1, min(per_page, app.config['LISTING_MAX_PER_PAGE']))
+  return (max(page, 1) - 1) * per_page, per_page
+
+def search_page(model, search_term):
+  # one page of search results when paging was asked for, else the best
+  # SEARCH_RESULTS_LIMIT matches
+  paging = page_args()
+  if paging is None:
+    return search_by_name(model, search_term, app.config['SEARCH_RESULTS_LIMIT'])
+  offset, per_page = paging
+  return search_by_name(model, search_term, per_page, offset)
+
+def delete_listings(venue_ids=(), artist_ids=()):
+  # delete venues and artists with their shows and genre links, one statement
+  # per table inside the caller's transaction. Show and genre rows would also go
+  # through ON DELETE CASCADE, they are deleted explicitly so that databases
+  # without enforced foreign keys (SQLite) stay consistent too. The caller
+  # commits, then calls forget_listings().
+  venue_ids = list(venue_ids)
+  artist_ids = list(artist_ids)
+  deleted = {'venues': 0, 'artists': 0, 'shows': 0}
+  if not venue_ids and not artist_ids:
+    return deleted
+  shows = db.or_(Show.venue_id.in_(venue_ids), Show.artist_id.in_(artist_ids))
+  # venues and artists that stay lose the deleted shows from their counters
+  affected = db.session.query(Show.venue_id, Show.artist_id).filter(shows).distinct().all()
+  deleted['shows'] = db.session.query(Show).filter(shows).delete(synchronize_session=False)
+  if venue_ids:
+    db.session.execute(venue_genres.delete().where(venue_genres.c.venue_id.in_(venue_ids)))
+    deleted['venues'] = db.session.query(Venue).filter(Venue.id.in_(venue_ids)) \
+      .delete(synchronize_session=False)
+  if artist_ids:
+    db.session.execute(artist_genres.delete().where(artist_genres.c.artist_id.in_(artist_ids)))
+    deleted['artists'] = db.session.query(Artist).filter(Artist.id.in_(artist_ids)) \
+      .delete(synchronize_session=False)
+
+  counted_at = counter_watermark()
+  remaining_venues = {venue_id for venue_id, _ in affected} - set(venue_ids)
+  remaining_artists = {artist_id for _, artist_id in affected} - set(artist_ids)
+  if remaining_venues:
+    recount_upcoming_shows(Venue, counted_at, remaining_venues)
+  if remaining_artists:
+    recount_upcoming_shows(Artist, counted_at, remaining_artists)
+  return deleted
+
+def forget_listings(venue_ids=(), artist_ids=()):
+  # after delete_listings() has been committed, as the create and edit
+  # handlers do after theirs: before it a request could cache the pages again
+  # with the deleted rows, and a failed commit would leave rows missing from
+  # the name indexes
+  for venue_id in venue_ids:
+    reindex_name(Venue, venue_id)
+  for artist_id in artist_ids:
+    reindex_name(Artist, artist_id)
+  cache.invalidate(*LISTING_PAGES)
+
+def genres_by_name(names):
+  # Genre rows for submitted genre names, creating the ones not stored yet
+  names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+  genres = Genre.query.filter(Genre.name.in_(names)).all() if names else []
+  known = {genre.name for genre in genres}
+  return genres + [Genre(name=name) for name in names if name not in known]
+
+def listing_values(form):
+  # column values of a venue/artist from its validated form, genres as rows
+  values = {name: field.data for name, field in form._fields.items()
+            if name not in ('csrf_token', 'genres')}
+  values['genres'] = genres_by_name(form.genres.data)
+  return values
+
+def form_errors(form):
+  # the validation errors of a form as one line for a flash message
+  return '; '.join('{}: {}'.format(name, ' '.join(errors)) for name, errors in form.errors.items())
+
+def with_genre(model, genre, paging=None):
+  # id, name and upcoming show counter of every venue/artist with the genre
+  # (or one page of them), found through the genre index of the association table
+  link = venue_genres if model is Venue else artist_genres
+  owner_id = link.c.venue_id if model is Venue else link.c.artist_id
+  query = db.session.query(model.id, model.name, model.upcoming_shows_count) \
+    .join(link, owner_id == model.id) \
+    .join(Genre, Genre.id == link.c.genre_id) \
+    .filter(Genre.name == genre) \
+    .order_by(model.name, model.id)
+  if paging:
+    offset, per_page = paging
+    query = query.offset(offset).limit(per_page)
+  rows = query.all()
+  started = started_since_count(model, request_time(), [item_id for item_id, _, _ in rows])
+  return [(item_id, name, count - started.get(item_id, 0)) for item_id, name, count in rows]
+
+def write_listing_batch(model, rows):
+  # one batch of validated venues or artists: names already stored (or repeated
+  # in the batch) are skipped, the rest is inserted with one executemany and
+  # their genres linked with another
+  link = venue_genres if model is Venue else artist_genres
+  owner_key = 'venue_id' if model is Venue else 'artist_id'
+  columns = [column.name for column in model.__table__.columns
+             if column.name not in ('id', 'upcoming_shows_count')]
+  names = [row['name'] for row in rows]
+  existing = {name for name, in db.session.query(model.name).filter(model.name.in_(names))}
+  fresh = {}
+  for row in rows:
+    if row['name'] not in existing:
+      fresh.setdefault(row['name'], row)
+  if not fresh:
+    return 0
+
+  db.session.execute(model.__table__.insert(),
+                     [{column: row.get(column) for column in columns} for row in fresh.values()])
+  ids = dict(db.session.query(model.name, model.id).filter(model.name.in_(list(fresh))))
+  genres = {genre.name: genre for genre in
+            genres_by_name([genre for row in fresh.values() for genre in row['genres']])}
+  db.session.add_all(genres.values())
+  db.session.flush()
+  links = [{owner_key: ids[name], 'genre_id': genres[genre.strip()].id}
+           for name, row in fresh.items() for genre in dict.fromkeys(row['genres'])]
+  if links:
+    db.session.execute(link.insert(), links)
+  db.session.commit()
+  for name in fresh:
+    reindex_name(model, ids[name], name)
+  return len(fresh)
+
+def insert_new_shows(rows):
+  # insert show rows, leaving the ones already stored to the unique constraint
+  # uq_Show_venue_id_artist_id_start_time (ON CONFLICT DO NOTHING), and return
+  # how many were inserted. PostgreSQL gets one multi-row INSERT, whose
+  # rowcount covers every row; SQLite an executemany, whose rowcount is summed
+  if db.engine.dialect.name == 'postgresql':
+    statement = postgresql.insert(Show.__table__).values(rows).on_conflict_do_nothing()
+    return db.session.execute(statement).rowcount
+  statement = sqlite.insert(Show.__table__).on_conflict_do_nothing()
+  return db.session.execute(statement, rows).rowcount
+
+def write_show_batch(rows):
+  # one batch of validated shows: shows of unknown venues or artists and shows
+  # already listed are skipped, the rest is inserted with one statement and
+  # the counters of the venues and artists involved recounted
+  shows = {}
+  for row in rows:
+    try:
+      shows.setdefault((int(row['venue_id']), int(row['artist_id']), row['start_time']), None)
+    except (TypeError, ValueError):
+      continue
+  if not shows:
+    return 0
+  venue_ids = {venue_id for venue_id, _, _ in shows}
+  artist_ids = {artist_id for _, artist_id, _ in shows}
+  known_venues = {venue_id for venue_id, in db.session.query(Venue.id).filter(Venue.id.in_(venue_ids))}
+  known_artists = {artist_id for artist_id, in db.session.query(Artist.id).filter(Artist.id.in_(artist_ids))}
+  candidates = [key for key in shows if key[0] in known_venues and key[1] in known_artists]
+  if not candidates:
+    return 0
+
+  written = insert_new_shows([
+    {'venue_id': venue_id, 'artist_id': artist_id, 'start_time': start_time}
+    for venue_id, artist_id, start_time in candidates])
+  # recounting is exact whichever of the upcoming shows were new
+  counted_at = counter_watermark()
+  upcoming_keys = [key for key in candidates if is_upcoming(key[2], counted_at)]
+  if written and upcoming_keys:
+    recount_upcoming_shows(Venue, counted_at, {venue_id for venue_id, _, _ in upcoming_keys})
+    recount_upcoming_shows(Artist, counted_at, {artist_id for _, artist_id, _ in upcoming_keys})
+  db.session.commit()
+  return written
+
+def import_listings(kind, records, batch_size=None):
+  # bulk import of 'venues', 'artists' or 'shows' records, see importer.py
+  form_class, write_batch = {
+    'venues': (VenueForm, lambda rows: write_listing_batch(Venue, rows)),
+    'artists': (ArtistForm, lambda rows: write_listing_batch(Artist, rows)),
+    'shows': (ShowForm, write_show_batch)
+  }[kind]
+  try:
+    return run_import(kind, records, form_class, write_batch,
+                      batch_size or app.config['IMPORT_BATCH_SIZE'])
+  except:
+    db.session.rollback()
+    raise
+  finally:
+    cache.invalidate(*LISTING_PAGES)
+
+def generate_data(venues, artists, shows, seed, batch_size=None, echo=None, anchor=generator.ANCHOR):
+  # deterministic synthetic venues, artists and shows (see generator.py),
+  # written batch by batch with executemany; new listings are numbered after
+  # the highest stored id, shows pick from all stored venues and artists and
+  # start around anchor, and shows already stored are skipped as in the import
+  # (write_show_batch), so a rerun adds listings but no duplicate shows
+  batch_size = batch_size or app.config['IMPORT_BATCH_SIZE']
+  written = {}
+  try:
+    for kind, model, count in (('venues', Venue, venues), ('artists', Artist, artists)):
+      start = (db.session.query(func.max(model.id)).scalar() or 0) + 1
+      records = generator.listings(kind, count, seed, start)
+      written[kind] = 0
+      while True:
+        rows = list(islice(records, batch_size))
+        if not rows:
+          break
+        written[kind] += write_listing_batch(model, rows)
+        if echo:
+          echo('{}: {}'.format(kind, written[kind]))
+
+    venue_ids = [venue_id for venue_id, in db.session.query(Venue.id).order_by(Venue.id)]
+    artist_ids = [artist_id for artist_id, in db.session.query(Artist.id).order_by(Artist.id)]
+    written['shows'] = 0
+    if venue_ids and artist_ids:
+      rows = generator.shows(shows, venue_ids, artist_ids, seed, anchor)
+      while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+          break
+        written['shows'] += write_show_batch(batch)
+        if echo:
+          echo('shows: {}'.format(written['shows']))
+    refresh_upcoming_show_counts(request_time())
+  except:
+    db.session.rollback()
+    raise
+  finally:
+    cache.invalidate(*LISTING_PAGES)
+  return written
+
+def read_only_rows(query):
+  # run a query for display only: plain rows straight from the request's
+  # connection, without autoflush and without ORM instances kept in the
+  # session's identity map
+  return db.session.connection().execute(query.statement)
+
+def venue_directory(current_time):
+  # one statement for the whole directory: every venue with its area and its
+  # stored upcoming show counter, ordered by area so the tree can be built in a
+  # single pass, and one for the counted shows that have started since
+  rows = db.session.query(Venue.city, Venue.state, Venue.id, Venue.name, Venue.upcoming_shows_count) \
+    .order_by(Venue.city, Venue.state, Venue.id).all()
+  started = started_since_count(Venue, current_time)
+
+  areas = []
+  for city, state, venue_id, name, num_upcoming_shows in rows:
+    if not areas or (areas[-1]['city'], areas[-1]['state']) != (city, state):
+      areas.append({
+        "city": city,
+        "state": state,
+        "venues": []
+      })
+    areas[-1]['venues'].append({
+      "id": venue_id,
+      "name": name,
+      "num_upcoming_shows": num_upcoming_shows - started.get(venue_id, 0)
+    })
+  return areas
+
+def timeline_query(counterpart, owner_filter):
+  # shows of one venue or artist joined with their counterpart model (the artist
+  # playing at a venue, the venue an artist plays at), ordered by start time
+  prefix = counterpart.__tablename__.lower()
+  return db.session.query(Show.start_time, counterpart.id, counterpart.name, counterpart.image_link) \
+    .join(counterpart, getattr(Show, prefix + '_id') == counterpart.id) \
+    .filter(owner_filter) \
+    .filter(Show.start_time.isnot(None)) \
+    .order_by(Show.start_time)
+
+def split_timeline(counterpart, rows, current_time):
+  # split the rows of timeline_query() into past and upcoming shows in one pass
+  prefix = counterpart.__tablename__.lower()
+  past_shows = []
+  upcoming_shows = []
+  for start_time, counterpart_id, name, image_link in rows:
+    show = {
+      prefix + "_id": counterpart_id,
+      prefix + "_name": name,
+      prefix + "_image_link": image_link,
+      "start_time": start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+    }
+    if is_upcoming(start_time, current_time):
+      upcoming_shows.append(show)
+    else:
+      past_shows.append(show)
+  return past_shows, upcoming_shows
+
+def listing_detail(model, item_id, current_time):
+  # the venue/artist row, its genre names and its past and upcoming shows from
+  # three independent SELECTs, run concurrently when ASYNC_READS is on
+  counterpart = Artist if model is Venue else Venue
+  link = venue_genres if model is Venue else artist_genres
+  owner_id = link.c.venue_id if model is Venue else link.c.artist_id
+  show_owner_id = Show.venue_id if model is Venue else Show.artist_id
+  statements = (
+    select(model.__table__).where(model.id == item_id),
+    select(Genre.name).join(link, link.c.genre_id == Genre.id).where(owner_id == item_id).order_by(Genre.id),
+    timeline_query(counterpart, show_owner_id == item_id).statement,
+  )
+  if async_reads:
+    item_rows, genre_rows, show_rows = async_reads.fetch_all(*statements)
+  else:
+    item_rows, genre_rows, show_rows = [db.session.execute(statement).all() for statement in statements]
+  if not item_rows:
+    abort(404)
+  past_shows, upcoming_shows = split_timeline(counterpart, show_rows, current_time)
+  return item_rows[0], [name for name, in genre_rows], past_shows, upcoming_shows
+
+def show_listing(after=None):
+  # shows with their venue and artist names in one joined query, in a stable
+  # (start_time, id) order so that pages can continue after a given show
+  query = db.session.query(Show.id, Show.start_time, Show.venue_id, Venue.name.label('venue_name'),
+                           Show.artist_id, Artist.name.label('artist_name'),
+                           Artist.image_link.label('artist_image_link')) \
+    .join(Venue, Show.venue_id == Venue.id) \
+    .join(Artist, Show.artist_id == Artist.id) \
+    .filter(Show.start_time.isnot(None)) \
+    .order_by(Show.start_time, Show.id)
+  if after:
+    query = query.filter(db.tuple_(Show.start_time, Show.id) > db.tuple_(*after))
+  return query
+
+def format_show(row):
+  return {
+    "venue_id": row.venue_id,
+    "venue_name": row.venue_name,
+    "artist_id": row.artist_id,
+    "artist_name": row.artist_name,
+    "artist_image_link": row.artist_image_link,
+    "start_time": row.start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
+  }
 
 #----------------------------------------------------------------------------#
 # Filters.
 #----------------------------------------------------------------------------#
 
-def format_datetime(value, format='medium'):
-  date = dateutil.parser.parse(value)
+@functools.lru_cache(maxsize=32)
+def datetime_pattern(format, locale):
+  # Babel pattern and locale data, compiled once per (format, locale)
+  return babel.dates.parse_pattern(format), babel.Locale.parse(locale)
+
+def parse_datetime(value):
+  # the views format start times as '%Y-%m-%dT%H:%M:%SZ'; read that directly
+  # and leave anything else to dateutil
+  if isinstance(value, datetime):
+    return value
+  if len(value) == 20 and value[10] == 'T' and value[19] == 'Z':
+    try:
+      return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                      int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except ValueError:
+      pass
+  return dateutil.parser.parse(value)
+
+def format_datetime(value, format='medium', locale=babel.dates.LC_TIME):
+  date = parse_datetime(value)
   if format == 'full':
       format="EEEE MMMM, d, y 'at' h:mma"
   elif format == 'medium':
       format="EE MM, dd, y h:mma"
-  return babel.dates.format_datetime(date, format)
+  pattern, locale = datetime_pattern(format, locale)
+  return pattern.apply(date, locale)
 
 app.jinja_env.filters['datetime'] = format_datetime
 
+def stream_template(template_name, **context):
+  # render a template lazily so large listings are sent in chunks
+  app.update_template_context(context)
+  template = app.jinja_env.get_template(template_name)
+  stream = template.stream(context)
+  stream.enable_buffering(app.config['SHOWS_STREAM_BATCH'])
+  return stream
+
 #----------------------------------------------------------------------------#
 # Controllers.
 #----------------------------------------------------------------------------#
@@ -98,47 +743,26 @@ def index():
 #  ----------------------------------------------------------------
 
 @app.route('/venues')
+@cache.cached
 def venues():
-  # get all areas by city and state
-  areas = Venue.query.with_entities(Venue.city, Venue.state, func.count(Venue.id)) \
-    .group_by(Venue.city, Venue.state).all()
-
-  # format data as needed
-  data = []
-  current_time = datetime.now()
-  for area in areas:
-    venues = Venue.query.filter_by(state=area.state).filter_by(city=area.city).all()
-    venue_infor = []
-    for venue in venues:
-      shows = Show.query.filter(Show.venue_id==venue.id).filter(Show.start_time > current_time).all()
-      venue_infor.append({
-        "id": venue.id,
-        "name": venue.name,
-        "num_upcoming_shows": len(shows)
-      })
-    data.append({
-      "city": area.city,
-      "state": area.state,
-      "venues": venue_infor
-    })
-
+  # areas, venues and upcoming show counts come from one aggregated query
+  data = venue_directory(request_time())
   return render_template('pages/venues.html', areas=data)
 
 @app.route('/venues/search', methods=['POST'])
 def search_venues():
   # get all venues based on search_term
   search_term = request.form['search_term']  
-  venues = Venue.query.filter(Venue.name.ilike(r'%{}%'.format(search_term))).all()
+  venues = search_page(Venue, search_term)
+  started = started_since_count(Venue, request_time(), [venue.id for venue in venues])
 
   # format data as needed
   data = []
-  current_time = datetime.now()
   for venue in venues:
-    shows = Show.query.filter(Show.venue_id==venue.id).filter(Show.start_time > current_time).all()
     data.append({
       "id": venue.id,
       "name": venue.name,
-      "num_upcoming_shows": len(shows)
+      "num_upcoming_shows": venue.upcoming_shows_count - started.get(venue.id, 0)
     })
   response={
     "count": len(venues),
@@ -146,42 +770,32 @@ def search_venues():
   }
   return render_template('pages/search_venues.html', results=response, search_term=request.form.get('search_term', ''))
 
+@app.route('/venues/genres/<genre>')
+@cache.cached
+def venues_by_genre(genre):
+  # all venues playing the genre
+  data = [{
+    "id": venue_id,
+    "name": name,
+    "num_upcoming_shows": num_upcoming_shows
+  } for venue_id, name, num_upcoming_shows in with_genre(Venue, genre, page_args())]
+  response={
+    "count": len(data),
+    "data": data
+  }
+  return render_template('pages/search_venues.html', results=response, search_term=genre)
+
 @app.route('/venues/<int:venue_id>')
+@cache.cached
 def show_venue(venue_id):
-  # retrieve venue based on ID
-  venue = Venue.query.filter_by(id=venue_id).all()[0]
-  # collect past shows
-  current_time = datetime.now()
-  past_shows_infor = Show.query.filter(Show.venue_id==venue.id).filter(Show.start_time < current_time).all()
-  # format past shows
-  past_shows = []
-  for show in past_shows_infor:
-    artist = Artist.query.filter_by(id=show.artist_id).all()[0]
-    start_time = show.start_time.strftime('%Y-%m-%dT%H:%M:%SZ'); print(start_time)
-    past_shows.append({
-      "artist_id": show.artist_id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": start_time
-    })
-  # collect upcoming shows
-  upcoming_shows_infor = Show.query.filter(Show.venue_id==venue.id).filter(Show.start_time >= current_time).all()
-  # format upcoming shows
-  upcoming_shows = []
-  for show in upcoming_shows_infor:
-    artist = Artist.query.filter_by(id=show.artist_id).all()[0]
-    start_time = show.start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
-    upcoming_shows.append({
-      "artist_id": show.artist_id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": start_time
-    })
+  # retrieve venue based on ID with its genres and its past and upcoming
+  # shows, the artists they play with joined in
+  venue, genres, past_shows, upcoming_shows = listing_detail(Venue, venue_id, request_time())
   # format data as needed
   data = {
     "id": venue.id,
     "name": venue.name,
-    "genres": venue.genres.split(','),
+    "genres": genres,
     "address": venue.address,
     "city": venue.city,
     "state": venue.state,
@@ -209,44 +823,36 @@ def create_venue_form():
 @app.route('/venues/create', methods=['POST'])
 def create_venue_submission():
   error = 0
+  # validate the form request against the field rules and choices
+  form = VenueForm()
+  name = form.name.data
   try:
-    # retrieve information from form request
-    name = request.form['name']
-    city = request.form['city']
-    state = request.form['state']
-    address = request.form['address']
-    phone = request.form['phone']
-    image_link = request.form['image_link']
-    facebook_link = request.form['facebook_link']
-    website = request.form['website']
-    genres = ','.join(request.form.getlist('genres'))
-    seeking_talent = 'seeking_talent' in request.form and request.form['seeking_talent'] == 'y'
-    seeking_description = request.form['seeking_description']
-
-    # check if conflict with Venue in db with same name
-    item = Venue.query.filter_by(name=name).all()
-    if len(item): error = 1 # Venue already exists!
+    if not form.validate():
+      error = 2 # invalid form data
     else:
-      # add it
-      item = Venue(name=name, city=city, state=state, address=address, phone=phone,
-                  image_link=image_link, facebook_link=facebook_link, website=website,
-                  genres=genres, seeking_talent=seeking_talent, seeking_description=seeking_description)
+      # add it, the unique constraint on the name rejects duplicates
+      item = Venue(**listing_values(form))
       db.session.add(item)
       db.session.commit()
+      reindex_name(Venue, item.id, name)
+      cache.invalidate('venues', 'venues_by_genre')
+  except IntegrityError as e:
+    error = 1 if is_unique_violation(e) else 4 # Venue already exists!
+    db.session.rollback()
   except:
     error = 4 # a dummy code for other db errors
     db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+    app.logger.exception('request failed')
 
   # error handling
   if error == 1:
-    flash('An error occurred. Venue ' + request.form['name'] + ' already exists.')
+    flash('An error occurred. Venue ' + name + ' already exists.')
+  elif error == 2:
+    flash('An error occurred. Venue ' + name + ' could not be listed: ' + form_errors(form))
   elif error:
-    flash('An error occurred. Venue ' + request.form['name'] + ' could not be listed.')
+    flash('An error occurred. Venue ' + name + ' could not be listed.')
   else:
-    flash('Venue ' + request.form['name'] + ' was successfully listed!')
+    flash('Venue ' + name + ' was successfully listed!')
 
   if error:
     return redirect(url_for('create_venue_submission'))
@@ -258,18 +864,14 @@ def delete_venue(venue_id):
   
   error = 0
   try:
-    # delete corresponding shows first
-    db.session.query(Show).filter(Show.venue_id==venue_id).delete()
-    db.session.commit()
-    # delete venue based on id
-    db.session.query(Venue).filter(Venue.id==venue_id).delete()
+    # delete the venue together with its shows in one transaction
+    delete_listings(venue_ids=[int(venue_id)])
     db.session.commit()
+    forget_listings(venue_ids=[int(venue_id)])
   except:
     error = 4
     db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+    app.logger.exception('request failed')
 
   # error handling
   if error:
@@ -283,12 +885,69 @@ def delete_venue(venue_id):
   # clicking that button delete it from the db then redirect the user to the homepage
   #return None
 
+@app.route('/listings/delete', methods=['POST'])
+def bulk_delete_listings():
+  # delete many venues and/or artists, and their shows, in one transaction:
+  # {"venue_ids": [...], "artist_ids": [...]}
+  body = request.get_json(silent=True) or {}
+  if not isinstance(body, dict):
+    abort(400)
+  try:
+    venue_ids = [int(venue_id) for venue_id in body.get('venue_ids', [])]
+    artist_ids = [int(artist_id) for artist_id in body.get('artist_ids', [])]
+  except (TypeError, ValueError):
+    abort(400)
+
+  try:
+    deleted = delete_listings(venue_ids, artist_ids)
+    db.session.commit()
+    forget_listings(venue_ids, artist_ids)
+  except:
+    db.session.rollback()
+    app.logger.exception('request failed')
+    return jsonify({
+      'success': False
+    }), 500
+
+  return jsonify({
+    'success': True,
+    'deleted': deleted
+  })
+
+@app.route('/import/<any(venues, artists, shows):kind>', methods=['POST'])
+def bulk_import(kind):
+  # stream CSV, JSON lines or a JSON array of records from the request body;
+  # ?format= overrides the Content-Type, ?batch_size= the configured batch size
+  fmt = request.args.get('format') or guess_format(None, request.content_type)
+  if fmt not in FORMATS:
+    abort(400)
+  batch_size = request.args.get('batch_size', None, type=int)
+  try:
+    report = import_listings(kind, read_records(text_stream(request.stream), fmt), batch_size)
+  except ValueError:
+    # a malformed JSON array or undecodable input; bad CSV rows and JSON lines
+    # are reported as row errors instead
+    abort(400)
+  except:
+    app.logger.exception('request failed')
+    return jsonify({
+      'success': False
+    }), 500
+
+  return jsonify(dict(report.to_dict(), success=True))
+
 #  Artists
 #  ----------------------------------------------------------------
 @app.route('/artists')
+@cache.cached
 def artists():  
-  # retrieve all artists
-  artists = Artist.query.all()
+  # retrieve the ids and names of all artists (or of one ?page=) as read-only rows
+  query = db.session.query(Artist.id, Artist.name).order_by(Artist.id)
+  paging = page_args()
+  if paging:
+    offset, per_page = paging
+    query = query.offset(offset).limit(per_page)
+  artists = read_only_rows(query)
   # format data as needed
   data = []
   for artist in artists:
@@ -296,23 +955,25 @@ def artists():
       "id": artist.id,
       "name": artist.name
     })
-  return render_template('pages/artists.html', artists=data)
+  page = request.args.get('page', type=int) if paging else None
+  has_next = paging is not None and len(data) == paging[1]
+  return render_template('pages/artists.html', artists=data, page=page, has_next=has_next,
+                         per_page=paging[1] if paging else None)
 
 @app.route('/artists/search', methods=['POST'])
 def search_artists():
   # retrieve all artists based on search_term
   search_term = request.form['search_term']  
-  artists = Artist.query.filter(Artist.name.ilike(r'%{}%'.format(search_term))).all()
+  artists = search_page(Artist, search_term)
+  started = started_since_count(Artist, request_time(), [artist.id for artist in artists])
 
   # format data as needed
   data = []
-  current_time = datetime.now()
   for artist in artists:
-    shows = Show.query.filter(Show.artist_id==artist.id).filter(Show.start_time > current_time).all()
     data.append({
       "id": artist.id,
       "name": artist.name,
-      "num_upcoming_shows": len(shows)
+      "num_upcoming_shows": artist.upcoming_shows_count - started.get(artist.id, 0)
     })
   response={
     "count": len(artists),
@@ -320,42 +981,32 @@ def search_artists():
   }
   return render_template('pages/search_artists.html', results=response, search_term=request.form.get('search_term', ''))
 
+@app.route('/artists/genres/<genre>')
+@cache.cached
+def artists_by_genre(genre):
+  # all artists playing the genre
+  data = [{
+    "id": artist_id,
+    "name": name,
+    "num_upcoming_shows": num_upcoming_shows
+  } for artist_id, name, num_upcoming_shows in with_genre(Artist, genre, page_args())]
+  response={
+    "count": len(data),
+    "data": data
+  }
+  return render_template('pages/search_artists.html', results=response, search_term=genre)
+
 @app.route('/artists/<int:artist_id>')
+@cache.cached
 def show_artist(artist_id):
-  # get artist based on ID
-  artist = Artist.query.filter_by(id=artist_id).all()[0]
-  # collect past shows
-  current_time = datetime.now()
-  past_shows_infor = Show.query.filter(Show.artist_id==artist.id).filter(Show.start_time < current_time).all()
-  # format past shows
-  past_shows = []
-  for show in past_shows_infor:
-    venue = Venue.query.filter_by(id=show.venue_id).all()[0]
-    start_time = show.start_time.strftime('%Y-%m-%dT%H:%M:%SZ'); print(start_time)
-    past_shows.append({
-      "venue_id": venue.id,
-      "venue_name": venue.name,
-      "venue_image_link": venue.image_link,
-      "start_time": start_time
-    })
-  # collect upcoming shows
-  upcoming_shows_infor = Show.query.filter(Show.artist_id==artist.id).filter(Show.start_time >= current_time).all()
-  # format upcoming shows
-  upcoming_shows = []
-  for show in upcoming_shows_infor:
-    venue = Venue.query.filter_by(id=show.venue_id).all()[0]
-    start_time = show.start_time.strftime('%Y-%m-%dT%H:%M:%SZ')
-    upcoming_shows.append({
-      "venue_id": venue.id,
-      "venue_name": venue.name,
-      "venue_image_link": venue.image_link,
-      "start_time": start_time
-    })
+  # retrieve artist based on ID with its genres and its past and upcoming
+  # shows, the venues they play with joined in
+  artist, genres, past_shows, upcoming_shows = listing_detail(Artist, artist_id, request_time())
   # format data as needed
   data = {
     "id": artist.id,
     "name": artist.name,
-    "genres": artist.genres.split(','),
+    "genres": genres,
     "city": artist.city,
     "state": artist.state,
     "phone": artist.phone,
@@ -383,37 +1034,36 @@ def edit_artist(artist_id):
 @app.route('/artists/<int:artist_id>/edit', methods=['POST'])
 def edit_artist_submission(artist_id):
   error = 0
+  form = ArtistForm()
   try:
-    # retrieve artist based on ID
-    item = db.session.query(Artist).filter(Artist.id==artist_id).first()
-    # modify its content based on editings
-    item.name = request.form['name']
-    item.city = request.form['city']
-    item.state = request.form['state']
-    item.phone = request.form['phone']
-    item.facebook_link = request.form['facebook_link']
-    item.genres = ','.join(request.form.getlist('genres'))
-    item.website = request.form['website']
-    item.image_link = request.form['image_link']
-    item.seeking_venue = 'seeking_venue' in request.form and request.form['seeking_venue'] == 'y'
-    item.seeking_description = request.form['seeking_description']
-    # commit the changes
-    db.session.commit()
+    if not form.validate():
+      error = 2 # invalid form data
+    else:
+      # retrieve artist based on ID
+      item = db.session.query(Artist).filter(Artist.id==artist_id).first()
+      # modify its content based on editings
+      for key, value in listing_values(form).items():
+        setattr(item, key, value)
+      # commit the changes
+      db.session.commit()
+      reindex_name(Artist, artist_id, form.name.data)
+      cache.invalidate('artists', 'artists_by_genre', cache.namespace('show_artist', artist_id),
+                       'show_venue', 'shows')
   except:
     error = 4
     db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+    app.logger.exception('request failed')
 
   # error handling
-  if error:
+  if error == 2:
+    flash('An error occurred. failed to update Artist ID = {}: {}'.format(artist_id, form_errors(form)))
+  elif error:
     flash('An error occurred. failed to update Artist ID = {}'.format(artist_id))
   else:
     flash('Artist ID = {} was successfully updated!'.format(artist_id))
 
   if error:
-    return redirect(url_for('create_artist_submission'))
+    return redirect(url_for('edit_artist', artist_id=artist_id))
   else:
     return redirect(url_for('show_artist', artist_id=artist_id))
 
@@ -427,38 +1077,36 @@ def edit_venue(venue_id):
 @app.route('/venues/<int:venue_id>/edit', methods=['POST'])
 def edit_venue_submission(venue_id):
   error = 0
+  form = VenueForm()
   try:
-    # retrieve venue based on ID
-    item = db.session.query(Venue).filter(Venue.id==venue_id).first()
-    # update its content based on editings
-    item.name = request.form['name']
-    item.city = request.form['city']
-    item.state = request.form['state']
-    item.address = request.form['address']
-    item.phone = request.form['phone']
-    item.image_link = request.form['image_link']
-    item.facebook_link = request.form['facebook_link']
-    item.website = request.form['website']
-    item.genres = ','.join(request.form.getlist('genres'))
-    item.seeking_talent = 'seeking_talent' in request.form and request.form['seeking_talent'] == 'y'
-    item.seeking_description = request.form['seeking_description']
-    # commit the changes
-    db.session.commit()
+    if not form.validate():
+      error = 2 # invalid form data
+    else:
+      # retrieve venue based on ID
+      item = db.session.query(Venue).filter(Venue.id==venue_id).first()
+      # update its content based on editings
+      for key, value in listing_values(form).items():
+        setattr(item, key, value)
+      # commit the changes
+      db.session.commit()
+      reindex_name(Venue, venue_id, form.name.data)
+      cache.invalidate('venues', 'venues_by_genre', cache.namespace('show_venue', venue_id),
+                       'show_artist', 'shows')
   except:
     error = 4
     db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+    app.logger.exception('request failed')
 
   # error handling
-  if error:
+  if error == 2:
+    flash('An error occurred. failed to update Venue ID = {}: {}'.format(venue_id, form_errors(form)))
+  elif error:
     flash('An error occurred. failed to update Venue ID = {}'.format(venue_id))
   else:
     flash('Venue  ID = {} was successfully updated!'.format(venue_id))
 
   if error:
-    return redirect(url_for('edit_venue_submission'))
+    return redirect(url_for('edit_venue', venue_id=venue_id))
   else:
     return redirect(url_for('show_venue', venue_id=venue_id))
 
@@ -473,42 +1121,36 @@ def create_artist_form():
 @app.route('/artists/create', methods=['POST'])
 def create_artist_submission():
   error = 0
+  # collect and validate all information about the new artist
+  form = ArtistForm()
+  name = form.name.data
   try:
-    # collect all information about the new artist
-    name = request.form['name']
-    city = request.form['city']
-    state = request.form['state']
-    phone = request.form['phone']
-    facebook_link = request.form['facebook_link']
-    genres = ','.join(request.form.getlist('genres'))
-    website = request.form['website']
-    image_link = request.form['image_link']
-    seeking_venue = 'seeking_venue' in request.form and request.form['seeking_venue'] == 'y'
-    seeking_description = request.form['seeking_description']
-    # check if already exist
-    item = Artist.query.filter_by(name=name).all()
-    if len(item): error = 1 # Artist already exists!
+    if not form.validate():
+      error = 2 # invalid form data
     else:
-      # create it in DB
-      item = Artist(name=name, city=city, state=state, phone=phone,
-                  image_link=image_link, facebook_link=facebook_link, website=website,
-                  genres=genres, seeking_venue=seeking_venue, seeking_description=seeking_description)
+      # create it in DB, the unique constraint on the name rejects duplicates
+      item = Artist(**listing_values(form))
       db.session.add(item)
       db.session.commit()
+      reindex_name(Artist, item.id, name)
+      cache.invalidate('artists', 'artists_by_genre')
+  except IntegrityError as e:
+    error = 1 if is_unique_violation(e) else 4 # Artist already exists!
+    db.session.rollback()
   except:
     error = 4
     db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+    app.logger.exception('request failed')
 
   # error handling
   if error == 1:
-    flash('An error occurred. Artist ' + request.form['name'] + ' already exists.')
+    flash('An error occurred. Artist ' + name + ' already exists.')
+  elif error == 2:
+    flash('An error occurred. Artist ' + name + ' could not be listed: ' + form_errors(form))
   elif error:
-    flash('An error occurred. Artist ' + request.form['name'] + ' could not be listed.')
+    flash('An error occurred. Artist ' + name + ' could not be listed.')
   else:
-    flash('Artist ' + request.form['name'] + ' was successfully listed!')
+    flash('Artist ' + name + ' was successfully listed!')
 
   if error:
     return redirect(url_for('create_artist_submission'))
@@ -520,25 +1162,33 @@ def create_artist_submission():
 #  ----------------------------------------------------------------
 
 @app.route('/shows')
+@cache.cached
 def shows():
-  # retrieve all shows from DB
-  shows = Show.query.all()
-
-  # format data as needed
-  data = []
-  for show in shows:
-    venue = Venue.query.filter_by(id=show.venue_id).all()[0]
-    artist = Artist.query.filter_by(id=show.artist_id).all()[0]
-    start_time = show.start_time.strftime('%Y-%m-%dT%H:%M:%SZ'); print(start_time)
-    data.append({
-      "venue_id": venue.id,
-      "venue_name": venue.name,
-      "artist_id": artist.id,
-      "artist_name": artist.name,
-      "artist_image_link": artist.image_link,
-      "start_time": start_time
-    })
-  return render_template('pages/shows.html', shows=data)
+  # keyset pagination: ?after=<start_time>,<id> of the last show already seen
+  after = request.args.get('after')
+  if after:
+    try:
+      after_time, after_id = after.rsplit(',', 1)
+      after = (datetime.strptime(after_time, SHOW_CURSOR_FORMAT), int(after_id))
+    except ValueError:
+      abort(400)
+
+  # ?stream=1 renders the remaining listing in chunks while rows are fetched
+  if request.args.get('stream', 0, type=int):
+    rows = show_listing(after).yield_per(app.config['SHOWS_STREAM_BATCH'])
+    data = (format_show(row) for row in rows)
+    return Response(stream_with_context(stream_template('pages/shows.html', shows=data)))
+
+  per_page = request.args.get('per_page', app.config['SHOWS_PER_PAGE'], type=int)
+  per_page = max(1, min(per_page, app.config['SHOWS_MAX_PER_PAGE']))
+  # fetch one extra row to know whether there is a next page
+  rows = show_listing(after).limit(per_page + 1).all()
+  next_cursor = None
+  if len(rows) > per_page:
+    rows = rows[:per_page]
+    next_cursor = '{},{}'.format(rows[-1].start_time.strftime(SHOW_CURSOR_FORMAT), rows[-1].id)
+  data = [format_show(row) for row in rows]
+  return render_template('pages/shows.html', shows=data, next_cursor=next_cursor, per_page=per_page)
 
 @app.route('/shows/create')
 def create_shows():
@@ -549,29 +1199,35 @@ def create_shows():
 @app.route('/shows/create', methods=['POST'])
 def create_show_submission():
   error = 0
+  # collect and validate all information about the new show
+  form = ShowForm()
   try:
-    # collect all information about the new show
-    start_time = request.form['start_time']
-    venue_id = request.form['venue_id']
-    artist_id = request.form['artist_id']
-    # check if already exist
-    item = Show.query.filter_by(start_time=start_time, venue_id=venue_id, artist_id=artist_id).all()
-    if len(item): error = 1 # Show already exists!
+    if not form.validate():
+      error = 2 # invalid form data
     else:
-      # create it in DB
+      start_time = form.start_time.data
+      venue_id = form.venue_id.data
+      artist_id = form.artist_id.data
+      # create it in DB, the unique constraint on (venue, artist, start time) rejects duplicates
       item = Show(start_time=start_time, venue_id=venue_id, artist_id=artist_id)
       db.session.add(item)
+      count_new_show(start_time, venue_id, artist_id)
       db.session.commit()
+      cache.invalidate('shows', cache.namespace('show_venue', venue_id), cache.namespace('show_artist', artist_id),
+                       'venues', 'venues_by_genre', 'artists_by_genre')
+  except IntegrityError as e:
+    error = 1 if is_unique_violation(e) else 4 # Show already exists!
+    db.session.rollback()
   except:
     error = 4
     db.session.rollback()
-    print(sys.exc_info())
-  finally:
-    db.session.close()
+    app.logger.exception('request failed')
 
   # error handling
   if error == 1:
     flash('An error occurred. This show already exists.')
+  elif error == 2:
+    flash('An error occurred. Show could not be listed: ' + form_errors(form))
   elif error:
     flash('An error occurred. Show could not be listed.')
   else:
@@ -582,6 +1238,21 @@ def create_show_submission():
   else:
     return render_template('pages/home.html')
 
+@app.route('/cache/stats')
+def cache_stats():
+  # hit/miss counters of the page cache in this process
+  return jsonify(cache.stats())
+
+@app.route('/pool/stats')
+def db_pool_stats():
+  # checkouts, hold time and overflow of this process' connection pool
+  return jsonify(pool_stats(db.engine))
+
+@app.route('/metrics')
+def prometheus_metrics():
+  # request, SQL and template timings of this process in Prometheus text format
+  return metrics.prometheus()
+
 @app.errorhandler(404)
 def not_found_error(error):
     return render_template('errors/404.html'), 404
@@ -601,6 +1272,61 @@ if not app.debug:
     app.logger.addHandler(file_handler)
     app.logger.info('errors')
 
+if app.config['REQUEST_LOG']:
+    request_log = logging.getLogger('fyyur.requests')
+    request_handler = logging.StreamHandler()
+    request_handler.setFormatter(Formatter('%(message)s'))
+    request_log.addHandler(request_handler)
+    request_log.setLevel(logging.INFO)
+    request_log.propagate = False
+
+#----------------------------------------------------------------------------#
+# Commands.
+#----------------------------------------------------------------------------#
+
+@app.cli.command('refresh-show-counts')
+def refresh_show_counts_command():
+  """Recompute the upcoming show counters of all venues and artists.
+
+  Pages subtract the counted shows that have started since the watermark. Each
+  server process advances it every COUNTER_ADVANCE_SECONDS by itself; run this
+  (e.g. daily from cron) to correct any drift with a full recount.
+  """
+  refresh_upcoming_show_counts(request_time())
+
+fyyur_cli = AppGroup('fyyur', help='Fyyur data management.')
+
+@fyyur_cli.command('import')
+@click.argument('kind', type=click.Choice(['venues', 'artists', 'shows']))
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(FORMATS),
+              help='Input format, guessed from the file extension by default.')
+@click.option('--batch-size', type=int, help='Rows written per statement batch.')
+def import_command(kind, source, fmt, batch_size):
+  """Bulk import venues, artists or shows from a CSV/JSON file ('-' for stdin)."""
+  report = import_listings(kind, read_records(source, fmt or guess_format(source.name)), batch_size)
+  click.echo(str(report))
+  for error in report.errors:
+    click.echo('  record {record}: {errors}'.format(**error))
+
+@fyyur_cli.command('generate')
+@click.option('--venues', type=int, default=1000, show_default=True)
+@click.option('--artists', type=int, default=1000, show_default=True)
+@click.option('--shows', type=int, default=10000, show_default=True)
+@click.option('--seed', type=int, default=1, show_default=True, help='Same seed, same data.')
+@click.option('--batch-size', type=int, help='Rows written per statement batch.')
+@click.option('--anchor', type=click.DateTime(formats=['%Y-%m-%d']),
+              default=generator.ANCHOR.strftime('%Y-%m-%d'), show_default=True,
+              help='Date the shows are spread around; same anchor, same shows.')
+def generate_command(venues, artists, shows, seed, batch_size, anchor):
+  """Fill the database with deterministic synthetic venues, artists and shows."""
+  started = time.perf_counter()
+  written = generate_data(venues, artists, shows, seed, batch_size, echo=click.echo, anchor=anchor)
+  click.echo('{venues} venues, {artists} artists and {shows} shows written'.format(**written) +
+             ' in {:.1f} s'.format(time.perf_counter() - started))
+
+app.cli.add_command(fyyur_cli)
+
 #----------------------------------------------------------------------------#
 # Launch.
 #----------------------------------------------------------------------------#
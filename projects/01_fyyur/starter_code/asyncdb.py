@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+# Optional asynchronous read path (ASYNC_READS). Each process runs one event
+# loop thread that owns an AsyncEngine and its connection pool; a view hands it
+# several independent SELECTs at once and waits a single time for all of them,
+# instead of paying one database round trip after another. The loop serves the
+# reads of every request thread, so slow queries only hold pool connections,
+# not extra threads. Needs asyncpg for PostgreSQL or aiosqlite for SQLite.
+# Statements run on the loop thread are outside any request, so the per-request
+# SQL figures of metrics.py do not include them.
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'postgres': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_uri(database_uri):
+    scheme, rest = database_uri.split('://', 1)
+    dialect = scheme.split('+')[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise ValueError('no async driver for {!r} databases'.format(dialect))
+    return '{}://{}'.format(ASYNC_DRIVERS[dialect], rest)
+
+
+def async_engine_options(options):
+    # the pool settings of dbpool.engine_options() for an async engine:
+    # asyncpg takes server settings instead of psycopg2's options string
+    connect_options = options.get('connect_args', {}).get('options', '')
+    options = {key: value for key, value in options.items() if key != 'connect_args'}
+    if connect_options.startswith('-c statement_timeout='):
+        options['connect_args'] = {'server_settings': {
+            'statement_timeout': connect_options.split('=', 1)[1]}}
+    return options
+
+
+class AsyncReader:
+    def __init__(self, database_uri, engine_options=None):
+        self.database_uri = async_database_uri(database_uri)
+        self.engine_options = async_engine_options(engine_options or {})
+        self.lock = threading.Lock()
+        self.loop = None
+        self.engine = None
+
+    def start(self):
+        # the loop thread and the engine are created on first use, so that
+        # forked workers each get their own
+        with self.lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='async-reads', daemon=True).start()
+                self.engine = create_async_engine(self.database_uri, **self.engine_options)
+                self.loop = loop
+        return self.loop
+
+    async def fetch(self, statement):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(statement)
+            return result.all()
+
+    async def gather(self, statements):
+        return await asyncio.gather(*(self.fetch(statement) for statement in statements))
+
+    def fetch_all(self, *statements, timeout=None):
+        # run the statements concurrently, each on a pooled connection of its
+        # own, and return the rows of each in order
+        loop = self.start()
+        return asyncio.run_coroutine_threadsafe(self.gather(statements), loop).result(timeout)
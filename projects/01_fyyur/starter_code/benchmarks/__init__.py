@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+
+def database_option(argv):
+    # the URL given with --database, None without one
+    for position, arg in enumerate(argv):
+        if arg == '--database' and position + 1 < len(argv):
+            return argv[position + 1]
+        if arg.startswith('--database='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+def use_benchmark_database(argv=None):
+    # point DATABASE_URL, before app is imported, at the --database URL or a
+    # throwaway SQLite file; returns the --database URL, None without one
+    database = database_option(sys.argv[1:] if argv is None else argv)
+    os.environ['DATABASE_URL'] = database or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'bench.db')
+    return database
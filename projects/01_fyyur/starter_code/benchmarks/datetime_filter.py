@@ -0,0 +1,68 @@
+"""Micro-benchmark of the Jinja `datetime` filter on a 10k-row shows page.
+
+Compares the original filter (dateutil parse + babel.dates.format_datetime on
+every value) with app.format_datetime, both on the filter alone and on a full
+render of pages/shows.html. Run from the starter_code directory:
+
+    python -m benchmarks.datetime_filter [rows]
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import babel.dates
+import dateutil.parser
+
+from app import app, format_datetime
+
+
+def legacy_format_datetime(value, format='medium'):
+    date = dateutil.parser.parse(value)
+    if format == 'full':
+        format = "EEEE MMMM, d, y 'at' h:mma"
+    elif format == 'medium':
+        format = "EE MM, dd, y h:mma"
+    return babel.dates.format_datetime(date, format)
+
+
+def fake_shows(rows):
+    start = datetime(2020, 1, 1, 20, 0)
+    return [{
+        "venue_id": i % 100,
+        "venue_name": "Venue {}".format(i % 100),
+        "artist_id": i % 500,
+        "artist_name": "Artist {}".format(i % 500),
+        "artist_image_link": "https://example.com/{}.jpg".format(i % 500),
+        "start_time": (start + timedelta(hours=i)).strftime('%Y-%m-%dT%H:%M:%SZ')
+    } for i in range(rows)]
+
+
+def best(fn, repeat=3):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+
+def main(rows=10000):
+    shows = fake_shows(rows)
+    values = [show['start_time'] for show in shows]
+    for format in ('full', 'medium'):
+        assert [legacy_format_datetime(v, format) for v in values[:500]] == \
+            [format_datetime(v, format) for v in values[:500]]
+
+    legacy = best(lambda: [legacy_format_datetime(v, 'full') for v in values])
+    fast = best(lambda: [format_datetime(v, 'full') for v in values])
+    print('filter only, {} values:  legacy {:8.1f} ms  fast {:8.1f} ms  x{:.1f}'.format(
+        rows, legacy * 1000, fast * 1000, legacy / fast))
+
+    filters = app.jinja_env.filters
+    with app.test_request_context('/shows'):
+        template = app.jinja_env.get_template('pages/shows.html')
+        filters['datetime'] = legacy_format_datetime
+        legacy = best(lambda: template.render(shows=shows))
+        filters['datetime'] = format_datetime
+        fast = best(lambda: template.render(shows=shows))
+    print('shows page, {} rows:     legacy {:8.1f} ms  fast {:8.1f} ms  x{:.1f}'.format(
+        rows, legacy * 1000, fast * 1000, legacy / fast))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
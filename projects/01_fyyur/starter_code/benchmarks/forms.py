@@ -0,0 +1,73 @@
+"""Cost of building, validating and rendering the venue/artist forms per request.
+
+Compares the forms in forms.py (FlaskForm base, module-level choice lists and
+validators shared by every field) with the same forms built the way they were
+before: the deprecated flask_wtf.Form base, which warns on every instance, and
+a validator and choice list of each field's own. Both are measured as the
+create and edit handlers use them: a blank form rendered into its template,
+and a submitted form validated. Run from the starter_code directory:
+
+    python -m benchmarks.forms [iterations]
+"""
+import copy
+import sys
+import timeit
+import warnings
+
+from flask_wtf import Form
+from wtforms.fields.core import UnboundField
+
+from app import app
+from forms import VenueForm, ArtistForm
+
+SUBMISSION = {
+    'name': 'The Musical Hop', 'city': 'San Francisco', 'state': 'WY', 'address': '1015 Folsom Street',
+    'phone': '123-123-1234', 'image_link': 'https://example.com/hop.jpg',
+    'facebook_link': 'https://www.facebook.com/TheMusicalHop', 'website': 'https://www.themusicalhop.com',
+    'genres': ['Jazz', 'Reggae', 'Soul', 'Folk', 'Other'], 'seeking_talent': 'y',
+    'seeking_description': 'We are on the lookout for a local artist to play every two weeks.',
+}
+
+
+def previous(form_class):
+    # the same fields on the deprecated base, each with its own validators
+    # and choice list as they were written out per field
+    fields = {}
+    for name in dir(form_class):
+        unbound = getattr(form_class, name)
+        if not isinstance(unbound, UnboundField):
+            continue
+        kwargs = dict(unbound.kwargs)
+        if 'validators' in kwargs:
+            kwargs['validators'] = [copy.copy(validator) for validator in kwargs['validators']]
+        if 'choices' in kwargs:
+            kwargs['choices'] = list(kwargs['choices'])
+        fields[name] = unbound.field_class(*unbound.args, **kwargs)
+    return type('Previous' + form_class.__name__, (Form,), fields)
+
+
+def best(fn, iterations, repeat=5):
+    return min(timeit.repeat(fn, number=iterations, repeat=repeat)) / iterations
+
+
+def main(iterations=2000):
+    app.config['WTF_CSRF_ENABLED'] = False
+    # the deprecation warning is still issued, just not printed
+    warnings.simplefilter('ignore')
+    for form_class, template in ((VenueForm, 'forms/new_venue.html'), (ArtistForm, 'forms/new_artist.html')):
+        results = []
+        for variant in (previous(form_class), form_class):
+            with app.test_request_context('/', method='POST', data=SUBMISSION):
+                form = variant()
+                assert form.validate(), form.errors
+                build = best(variant, iterations)
+                validate = best(lambda: variant().validate(), iterations)
+                render = best(lambda: app.jinja_env.get_template(template).render(form=variant()), iterations // 10)
+            results.append((build, validate, render))
+        for label, (build, validate, render) in zip(('previous', 'current'), results):
+            print('{:11} {:8}  build {:6.1f} us  build+validate {:6.1f} us  build+render {:7.1f} us'.format(
+                form_class.__name__, label, build * 1e6, validate * 1e6, render * 1e6))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,210 @@
+"""Latency, throughput and queries per request for every fyyur route.
+
+Seeds a throwaway SQLite file with the given numbers of generated venues,
+artists and shows (see generator.py), then drives each route through the Flask
+test client and reports p50/p95/p99 latency, requests per second and SQL
+statements per request. The page cache is off unless --cache is given, so every
+request runs its handler. Run from the starter_code directory:
+
+    python -m benchmarks.routes [--venues N] [--artists N] [--shows N] [--requests N]
+
+DATABASE_URL is ignored; only a database named with --database URL is seeded
+instead of the SQLite file, and its tables are dropped and recreated.
+
+With --http URL the same routes are requested over HTTP from --concurrency
+threads against an already running server (seeded separately); statement
+counts are then not available.
+
+--save FILE writes the results as JSON; --baseline FILE compares against a
+saved run and exits with status 1 when a route issues more SQL statements, or
+its p95 grows by more than --tolerance (a fraction, 0.5 by default).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+from benchmarks import use_benchmark_database
+
+DATABASE = use_benchmark_database()
+os.environ.setdefault('REQUEST_LOG', 'false')
+if '--cache' not in sys.argv:
+    os.environ['CACHE_TYPE'] = 'null'
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import app, db, generate_data
+
+
+def seed(venues, artists, shows, data_seed):
+    if DATABASE:
+        db.drop_all()
+    db.create_all()
+    generate_data(venues, artists, shows, data_seed)
+    db.session.remove()
+
+
+def routes(venues, artists, rng):
+    # (label, method, path factory, form data) for every page of the app
+    def venue():
+        return rng.randint(1, venues)
+
+    def artist():
+        return rng.randint(1, artists)
+
+    return [
+        ('home', 'get', lambda: '/', None),
+        ('venues', 'get', lambda: '/venues', None),
+        ('venues by genre', 'get', lambda: '/venues/genres/Jazz', None),
+        ('venue detail', 'get', lambda: '/venues/{}'.format(venue()), None),
+        ('venue search', 'post', lambda: '/venues/search', {'search_term': 'Blue Room'}),
+        ('venue edit form', 'get', lambda: '/venues/{}/edit'.format(venue()), None),
+        ('venue create form', 'get', lambda: '/venues/create', None),
+        ('artists', 'get', lambda: '/artists', None),
+        ('artists page', 'get', lambda: '/artists?page=2', None),
+        ('artists by genre', 'get', lambda: '/artists/genres/Jazz', None),
+        ('artist detail', 'get', lambda: '/artists/{}'.format(artist()), None),
+        ('artist search', 'post', lambda: '/artists/search', {'search_term': 'Neon Wolves'}),
+        ('artist edit form', 'get', lambda: '/artists/{}/edit'.format(artist()), None),
+        ('artist create form', 'get', lambda: '/artists/create', None),
+        ('shows', 'get', lambda: '/shows', None),
+        ('shows 200', 'get', lambda: '/shows?per_page=200', None),
+        ('show create form', 'get', lambda: '/shows/create', None),
+    ]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summary(latencies, elapsed, statements=None):
+    result = {
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'rps': len(latencies) / elapsed,
+    }
+    if statements is not None:
+        result['queries'] = max(statements)
+    return result
+
+
+def run_test_client(cases, requests):
+    counter = {'statements': 0}
+
+    def count(*args):
+        counter['statements'] += 1
+    event.listen(Engine, 'before_cursor_execute', count)
+
+    client = app.test_client()
+    results = {}
+    for label, method, path, data in cases:
+        getattr(client, method)(path(), data=data)  # warm up
+        latencies, statements = [], []
+        started = time.perf_counter()
+        for _ in range(requests):
+            counter['statements'] = 0
+            request_started = time.perf_counter()
+            response = getattr(client, method)(path(), data=data)
+            latencies.append(time.perf_counter() - request_started)
+            statements.append(counter['statements'])
+            if response.status_code >= 400:
+                raise SystemExit('{} {} answered {}'.format(method.upper(), label, response.status_code))
+        results[label] = summary(latencies, time.perf_counter() - started, statements)
+    return results
+
+
+def run_http(base_url, cases, requests, concurrency):
+    results = {}
+    for label, method, path, data in cases:
+        latencies = []
+        lock = threading.Lock()
+        body = urllib.parse.urlencode(data).encode() if data else None
+
+        def worker(count):
+            for _ in range(count):
+                request_started = time.perf_counter()
+                with urllib.request.urlopen(base_url.rstrip('/') + path(), data=body) as response:
+                    response.read()
+                with lock:
+                    latencies.append(time.perf_counter() - request_started)
+
+        threads = [threading.Thread(target=worker, args=(requests // concurrency + (i < requests % concurrency),))
+                   for i in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results[label] = summary(latencies, time.perf_counter() - started)
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    failures = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if before is None:
+            continue
+        if 'queries' in result and 'queries' in before and result['queries'] > before['queries']:
+            failures.append('{}: {} queries, was {}'.format(label, result['queries'], before['queries']))
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            failures.append('{}: p95 {:.1f} ms, was {:.1f} ms'.format(label, result['p95_ms'], before['p95_ms']))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--venues', type=int, default=1000)
+    parser.add_argument('--artists', type=int, default=2000)
+    parser.add_argument('--shows', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=50, help='requests per route')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database', metavar='URL',
+                        help='seed this database, dropping its tables, instead of a new SQLite file')
+    parser.add_argument('--cache', action='store_true', help='keep the page cache on')
+    parser.add_argument('--http', metavar='URL', help='load a running server instead of the test client')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--save', metavar='FILE')
+    parser.add_argument('--baseline', metavar='FILE')
+    parser.add_argument('--tolerance', type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    cases = routes(args.venues, args.artists, rng)
+    if args.http:
+        results = run_http(args.http, cases, args.requests, args.concurrency)
+    else:
+        with app.app_context():
+            started = time.perf_counter()
+            seed(args.venues, args.artists, args.shows, args.seed)
+            print('seeded {} venues, {} artists, {} shows in {:.1f} s'.format(
+                args.venues, args.artists, args.shows, time.perf_counter() - started))
+        results = run_test_client(cases, args.requests)
+
+    print('{:20} {:>9} {:>9} {:>9} {:>9} {:>8}'.format('route', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s', 'queries'))
+    for label, result in results.items():
+        print('{:20} {p50_ms:9.2f} {p95_ms:9.2f} {p99_ms:9.2f} {rps:9.1f} {:>8}'.format(
+            label, result.get('queries', '-'), **result))
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = regressions(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print('REGRESSION ' + failure)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Memory and allocations per request for a large artist listing.
+
+Seeds a throwaway SQLite database with 100k artists and builds the /artists
+listing data twice: the old way (full ORM objects through Artist.query.all(),
+kept in the session's identity map until the request ends) and through
+app.read_only_rows() (plain rows, nothing retained by the session). Run from the
+starter_code directory:
+
+    python -m benchmarks.session_memory [rows] [--database URL]
+
+DATABASE_URL is ignored; only a database named with --database is used instead
+of the SQLite file, and its tables are dropped and recreated.
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+
+from benchmarks import use_benchmark_database
+
+DATABASE = use_benchmark_database()
+
+from app import app, db, Artist, read_only_rows
+
+
+def seed(rows):
+    if DATABASE:
+        db.drop_all()
+    db.create_all()
+    db.session.execute(Artist.__table__.insert(), [{
+        'name': 'Artist {}'.format(i),
+        'city': 'San Francisco',
+        'state': 'CA',
+        'phone': '326-123-5000',
+        'image_link': 'https://example.com/artists/{}.jpg'.format(i),
+        'facebook_link': 'https://www.facebook.com/artist{}'.format(i),
+        'website': 'https://example.com/artists/{}'.format(i),
+        'seeking_venue': i % 2 == 0,
+        'seeking_description': 'Looking for shows to perform at in the San Francisco Bay Area! ' * 4,
+    } for i in range(rows)])
+    db.session.commit()
+    db.session.remove()
+
+
+def orm_listing():
+    return [{"id": artist.id, "name": artist.name} for artist in Artist.query.all()]
+
+
+def read_only_listing():
+    return [{"id": artist.id, "name": artist.name}
+            for artist in read_only_rows(Artist.query.order_by(Artist.id))]
+
+
+def measure(build):
+    # one simulated request: build the listing, then end the request
+    with app.test_request_context('/artists'):
+        tracemalloc.start()
+        started = time.perf_counter()
+        data = build()
+        seconds = time.perf_counter() - started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.session.remove()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    return len(data), seconds, peak, blocks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('rows', type=int, nargs='?', default=100000)
+    parser.add_argument('--database', metavar='URL',
+                        help='seed this database, dropping its tables, instead of a new SQLite file')
+    rows = parser.parse_args(argv).rows
+    with app.app_context():
+        seed(rows)
+    for label, build in (('ORM objects', orm_listing), ('read-only rows', read_only_listing)):
+        count, seconds, peak, blocks = measure(build)
+        print('{:15} {} rows  {:7.1f} ms  peak {:7.1f} MiB  live blocks {:>9}'.format(
+            label, count, seconds * 1000, peak / 2 ** 20, blocks))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+import functools
+import itertools
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, request, session
+
+# Response cache for the read-only pages. Entries are keyed by endpoint and
+# full path; every endpoint, and every endpoint/view-args pair, carries a
+# generation number that is part of the key, so invalidating a page (or all
+# pages of an endpoint) is one counter bump and stale entries simply age out.
+
+
+class SimpleCache:
+    # in-process LRU with per-entry expiry. Generations are entries of the same
+    # LRU, so there are never more than threshold of them; each is a token that
+    # is never reused, so a generation that expires or is evicted gets a fresh
+    # one and the pages keyed with the old token can never be served again
+    def __init__(self, threshold=500, generation_timeout=3600):
+        self.threshold = threshold
+        self.generation_timeout = generation_timeout
+        self.entries = OrderedDict()
+        self.tokens = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def _set(self, key, value, timeout):
+        self.entries[key] = (time.monotonic() + timeout, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.threshold:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        with self.lock:
+            return self._get(key)
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self._set(key, value, timeout)
+
+    def generations(self, names):
+        with self.lock:
+            tokens = []
+            for name in names:
+                token = self._get('gen:' + name)
+                if token is None:
+                    token = next(self.tokens)
+                    self._set('gen:' + name, token, self.generation_timeout)
+                tokens.append(token)
+            return tokens
+
+    def bump(self, name):
+        with self.lock:
+            self._set('gen:' + name, next(self.tokens), self.generation_timeout)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisCache:
+    # shared cache for multi-worker deployments, needs the `redis` package and
+    # a Redis-compatible server (CACHE_REDIS_URL)
+    def __init__(self, url, prefix='fyyur:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, timeout):
+        self.client.set(self.prefix + key, value, ex=int(timeout))
+
+    def generations(self, names):
+        values = self.client.mget([self.prefix + 'gen:' + name for name in names])
+        return [int(value or 0) for value in values]
+
+    def bump(self, name):
+        self.client.incr(self.prefix + 'gen:' + name)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        # CACHE_TYPE is 'simple' (in-process LRU), 'redis' or 'null' (disabled)
+        cache_type = app.config.get('CACHE_TYPE', 'simple')
+        if cache_type == 'simple':
+            self.backend = SimpleCache(app.config.get('CACHE_THRESHOLD', 500),
+                                       app.config.get('CACHE_GENERATION_TIMEOUT', 3600))
+        elif cache_type == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        elif cache_type == 'null':
+            self.backend = None
+        else:
+            raise ValueError('unknown CACHE_TYPE {!r}'.format(cache_type))
+        self.timeout = app.config.get('CACHE_DEFAULT_TIMEOUT', 60)
+
+    @staticmethod
+    def namespace(endpoint, *args):
+        return ':'.join([endpoint] + [str(arg) for arg in args])
+
+    def cached(self, view):
+        # cache the HTML of a read-only view for GET requests
+        @functools.wraps(view)
+        def wrapper(**kwargs):
+            # pending flash messages make the page user specific
+            if self.backend is None or request.method != 'GET' or '_flashes' in session:
+                return view(**kwargs)
+            names = [request.endpoint, self.namespace(request.endpoint, *kwargs.values())]
+            key = '{}:{}'.format(':'.join(str(gen) for gen in self.backend.generations(names)),
+                                 request.full_path)
+            body = self.backend.get(key)
+            if body is not None:
+                self.count(hit=True)
+                return Response(body, mimetype='text/html')
+            self.count(hit=False)
+            rv = view(**kwargs)
+            if isinstance(rv, str):
+                self.backend.set(key, rv.encode('utf-8'), self.timeout)
+            return rv
+        return wrapper
+
+    def invalidate(self, *namespaces):
+        # drop the cached pages of whole endpoints ('show_venue') or of single
+        # pages ('show_venue:3', see namespace())
+        if self.backend is None:
+            return
+        for name in namespaces:
+            self.backend.bump(name)
+
+    def count(self, hit):
+        with self.stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        with self.stats_lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': hits,
+            'misses': misses
+        }
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+import weakref
+
+from sqlalchemy import event
+
+# Connection pool settings of the app, read from the environment so that pools
+# can be sized per deployment (e.g. gunicorn workers x DB_POOL_SIZE +
+# DB_MAX_OVERFLOW must stay below the server's max_connections):
+#
+#   DB_POOL_SIZE            connections kept open per process (5)
+#   DB_MAX_OVERFLOW         extra connections allowed under load (10)
+#   DB_POOL_TIMEOUT         seconds to wait for a free connection (30)
+#   DB_POOL_RECYCLE         seconds before a connection is replaced (1800)
+#   DB_POOL_PRE_PING        test connections on checkout (true)
+#   DB_STATEMENT_TIMEOUT_MS PostgreSQL statement_timeout, 0 disables it (0)
+#
+# instrument_pool() counts checkouts, connects and the time connections are
+# held through the public pool events. The events cannot see a request waiting
+# for a free connection; a peak_checked_out that reaches size + max_overflow
+# is the sign that requests queued for one.
+#
+# Each project is deployed on its own and carries its own copy of this module:
+# this file is kept identical in fyyur and trivia, and the coffee shop and
+# capstone copies hold env_flag() and engine_options() without the
+# instrumentation. Change them together.
+
+
+def env_flag(name, default, environ=os.environ):
+    return environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_uri, environ=os.environ):
+    # SQLALCHEMY_ENGINE_OPTIONS for the given database; SQLite keeps the
+    # defaults Flask-SQLAlchemy picks for it
+    if database_uri.startswith('sqlite'):
+        return {}
+    options = {
+        'pool_size': int(environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_flag('DB_POOL_PRE_PING', 'true', environ),
+    }
+    statement_timeout = int(environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    if statement_timeout and database_uri.startswith('postgres'):
+        options['connect_args'] = {'options': '-c statement_timeout={}'.format(statement_timeout)}
+    return options
+
+
+class PoolCounters:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.peak_overflow = None
+        self.hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+
+
+# counters of every instrumented engine, dropped with the engine
+counters = weakref.WeakKeyDictionary()
+
+
+def instrument_pool(engine):
+    # attach the counting listeners to an engine once; they stay on the pool
+    # the engine recreates after dispose()
+    if engine in counters:
+        return counters[engine]
+    stats = counters[engine] = PoolCounters()
+    engine_ref = weakref.ref(engine)
+
+    def on_connect(dbapi_connection, connection_record):
+        with stats.lock:
+            stats.connects += 1
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['checked_out_at'] = time.perf_counter()
+        pool = getattr(engine_ref(), 'pool', None)
+        overflow = pool.overflow() if hasattr(pool, 'overflow') else None
+        with stats.lock:
+            stats.checkouts += 1
+            stats.checked_out += 1
+            stats.peak_checked_out = max(stats.peak_checked_out, stats.checked_out)
+            if overflow is not None:
+                stats.peak_overflow = overflow if stats.peak_overflow is None else max(stats.peak_overflow, overflow)
+
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop('checked_out_at', None)
+        if checked_out_at is None:
+            return
+        held = time.perf_counter() - checked_out_at
+        with stats.lock:
+            stats.checkins += 1
+            stats.checked_out -= 1
+            stats.hold_seconds += held
+            stats.max_hold_seconds = max(stats.max_hold_seconds, held)
+
+    event.listen(engine, 'connect', on_connect)
+    event.listen(engine, 'checkout', on_checkout)
+    event.listen(engine, 'checkin', on_checkin)
+    return stats
+
+
+def pool_stats(engine):
+    pool = engine.pool
+    stats = {
+        'pool': type(pool).__name__,
+        'status': pool.status()
+    }
+    for name in ('size', 'overflow'):
+        if hasattr(pool, name):
+            stats[name] = getattr(pool, name)()
+    stats['max_overflow'] = getattr(pool, '_max_overflow', None)
+    counted = counters.get(engine)
+    if counted is not None:
+        with counted.lock:
+            stats.update({
+                'connects': counted.connects,
+                'checkouts': counted.checkouts,
+                'checkins': counted.checkins,
+                'checked_out': counted.checked_out,
+                'peak_checked_out': counted.peak_checked_out,
+                'peak_overflow': counted.peak_overflow,
+                'hold_seconds_total': round(counted.hold_seconds, 6),
+                'hold_seconds_max': round(counted.max_hold_seconds, 6),
+            })
+    return stats
@@ -0,0 +1,125 @@
+import random
+from datetime import datetime, timedelta
+
+from forms import GENRE_CHOICES, STATE_CHOICES
+
+# Deterministic synthetic data for load and performance testing. Venues and
+# artists live in real cities weighted by population, with one to three genres
+# from the form choices (a few genres are much more common than the rest);
+# shows are spread over the past years and the coming months, mostly in the
+# evening, and a minority of popular venues and artists get most of them.
+#
+# Every kind of row has its own random stream derived from the seed, so the
+# same seed always produces the same venues and artists, and the same shows
+# for the same venue and artist ids and anchor date.
+
+GENRES = [value for value, _ in GENRE_CHOICES]
+
+# (city, state, population in thousands)
+CITIES = [
+    ('New York', 'NY', 8336), ('Los Angeles', 'CA', 3979), ('Chicago', 'IL', 2693),
+    ('Houston', 'TX', 2320), ('Phoenix', 'AZ', 1680), ('Philadelphia', 'PA', 1584),
+    ('San Antonio', 'TX', 1547), ('San Diego', 'CA', 1423), ('Dallas', 'TX', 1343),
+    ('San Jose', 'CA', 1021), ('Austin', 'TX', 978), ('Jacksonville', 'FL', 911),
+    ('Columbus', 'OH', 898), ('Charlotte', 'NC', 885), ('San Francisco', 'CA', 881),
+    ('Indianapolis', 'IN', 876), ('Seattle', 'WA', 753), ('Denver', 'CO', 727),
+    ('Washington', 'DC', 705), ('Boston', 'MA', 692), ('Nashville', 'TN', 670),
+    ('Detroit', 'MI', 670), ('Portland', 'OR', 654), ('Las Vegas', 'NV', 651),
+    ('Memphis', 'TN', 651), ('Louisville', 'KY', 617), ('Baltimore', 'MD', 593),
+    ('Milwaukee', 'WI', 590), ('Albuquerque', 'NM', 560), ('Atlanta', 'GA', 506),
+    ('Kansas City', 'MO', 495), ('Miami', 'FL', 467), ('Minneapolis', 'MN', 429),
+    ('New Orleans', 'LA', 390), ('Salt Lake City', 'UT', 200), ('Burlington', 'VT', 44),
+]
+assert all((state, state) in STATE_CHOICES for _, state, _ in CITIES)
+
+VENUE_WORDS = (['The Blue', 'The Velvet', 'Golden', 'Red Rock', 'Old Town', 'Electric', 'Silver',
+                'Harbor', 'Midnight', 'Union', 'Lucky', 'Black Cat', 'Crystal', 'Grand'],
+               ['Room', 'Hall', 'Lounge', 'Tavern', 'Ballroom', 'Theatre', 'Club', 'Cellar',
+                'Garden', 'Saloon', 'Pavilion', 'Warehouse'])
+ARTIST_WORDS = (['Wild', 'Quiet', 'Neon', 'Paper', 'Iron', 'Velvet', 'Lonesome', 'Atomic', 'Crimson',
+                 'Northern', 'Hollow', 'Broken', 'Sunday', 'Electric'],
+                ['Wolves', 'Rivers', 'Echoes', 'Ghosts', 'Kings', 'Strangers', 'Horses', 'Lights',
+                 'Saints', 'Machines', 'Tides', 'Sparrows'])
+
+DESCRIPTIONS = ['', 'Looking for local acts to play on weekends.', 'Always happy to hear from new bands!',
+                'Seeking a regular Thursday night residency.']
+
+# shows are placed around this date unless another anchor is given, so that
+# generated data does not depend on the day it is generated
+ANCHOR = datetime(2026, 1, 1)
+# share of generated shows that start before the anchor
+PAST_SHARE = 0.7
+PAST_DAYS = 3 * 365
+FUTURE_DAYS = 180
+SHOW_HOURS = [18, 19, 19, 20, 20, 20, 21, 21, 22, 23]
+
+
+def stream(seed, kind):
+    return random.Random('{}:{}'.format(seed, kind))
+
+
+def genre_weights(rng):
+    # Zipf-like popularity over the genres in a seed-dependent order
+    order = GENRES[:]
+    rng.shuffle(order)
+    return order, [1 / rank for rank in range(1, len(order) + 1)]
+
+
+def listings(kind, count, seed, start=0):
+    # 'venues' or 'artists' records as accepted by the create forms, numbered
+    # from start so that names stay unique across calls
+    rng = stream(seed, kind)
+    genres, weights = genre_weights(rng)
+    cities = [(city, state) for city, state, _ in CITIES]
+    population = [people for _, _, people in CITIES]
+    first, second = VENUE_WORDS if kind == 'venues' else ARTIST_WORDS
+    for i in range(start, start + count):
+        city, state = rng.choices(cities, population)[0]
+        picked = []
+        for genre in rng.choices(genres, weights, k=rng.choice((1, 1, 2, 2, 3))):
+            if genre not in picked:
+                picked.append(genre)
+        slug = '{}{}'.format(kind[:-1], i)
+        record = {
+            'name': '{} {} {}'.format(rng.choice(first), rng.choice(second), i),
+            'city': city,
+            'state': state,
+            'phone': '{}-{}-{:04}'.format(rng.randint(200, 999), rng.randint(200, 999), rng.randint(0, 9999)),
+            'genres': picked,
+            'image_link': 'https://images.example.com/{}.jpg'.format(slug),
+            'facebook_link': 'https://www.facebook.com/{}'.format(slug),
+            'website': 'https://{}.example.com'.format(slug),
+            'seeking_description': rng.choice(DESCRIPTIONS),
+        }
+        if kind == 'venues':
+            record['address'] = '{} {} Street'.format(rng.randint(1, 2999), rng.choice(second))
+            record['seeking_talent'] = bool(record['seeking_description'])
+        else:
+            record['seeking_venue'] = bool(record['seeking_description'])
+        yield record
+
+
+def skewed(rng, ids):
+    # most shows go to the first (most popular) ids
+    return ids[int(len(ids) * rng.random() ** 2)]
+
+
+def shows(count, venue_ids, artist_ids, seed, anchor=ANCHOR):
+    # show rows between the given venues and artists on the hour or half hour.
+    # The same venue, artist and start time can come up more than once; the
+    # writer skips repeats (see app.write_show_batch)
+    rng = stream(seed, 'shows')
+    anchor = anchor.replace(hour=0, minute=0, second=0, microsecond=0)
+    venue_ids, artist_ids = list(venue_ids), list(artist_ids)
+    for i in range(count):
+        if rng.random() < PAST_SHARE:
+            day = -rng.randint(1, PAST_DAYS)
+        else:
+            day = rng.randint(1, FUTURE_DAYS)
+        start_time = (anchor + timedelta(days=day)).replace(
+            hour=rng.choice(SHOW_HOURS), minute=rng.choice((0, 0, 30)))
+        yield {
+            'venue_id': skewed(rng, venue_ids),
+            'artist_id': skewed(rng, artist_ids),
+            'start_time': start_time,
+        }
@@ -0,0 +1,200 @@
+import csv
+import functools
+import io
+import json
+import reprlib
+import time
+from itertools import islice
+
+from werkzeug.datastructures import MultiDict
+from wtforms import BooleanField
+from wtforms.fields.core import UnboundField
+
+# Streaming bulk import of venues, artists and shows. Records are read one at a
+# time from CSV, JSON lines or a JSON array, validated with the same WTForms
+# rules as the create forms, and handed to a writer in batches; app.py provides
+# the writers that turn a batch into a few executemany statements.
+
+FORMATS = ('csv', 'jsonl', 'json')
+MAX_REPORTED_ERRORS = 20
+# spellings of boolean cells, compared case-insensitively; an empty cell is false
+BOOLEANS = {'true': True, 'yes': True, 'y': True, '1': True,
+            'false': False, 'no': False, 'n': False, '0': False, '': False}
+
+
+def guess_format(name, content_type=None):
+    if content_type:
+        if 'csv' in content_type:
+            return 'csv'
+        if 'ndjson' in content_type or 'jsonl' in content_type:
+            return 'jsonl'
+        if 'json' in content_type:
+            return 'json'
+    for fmt in FORMATS:
+        if name and name.endswith('.' + fmt):
+            return fmt
+    return 'jsonl'
+
+
+class BadRecord:
+    # a CSV row or JSON line that could not be parsed; run_import() reports it
+    # as a row error and goes on with the next one
+    def __init__(self, error):
+        self.error = error
+
+
+def read_records(stream, fmt):
+    # yield records from a text stream without loading it, except for a JSON
+    # array which has to be parsed as a whole (a malformed array raises
+    # ValueError before anything is written)
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        while True:
+            try:
+                record = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as error:
+                record = BadRecord('Not a valid CSV row: {}.'.format(error))
+            yield record
+    elif fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as error:
+                    yield BadRecord('Not valid JSON: {}.'.format(error))
+    elif fmt == 'json':
+        for record in json.load(stream):
+            yield record
+    else:
+        raise ValueError('unknown import format {!r}'.format(fmt))
+
+
+def text_stream(binary, encoding='utf-8'):
+    return io.TextIOWrapper(binary, encoding=encoding, newline='')
+
+
+def formdata(record):
+    # a record as the form post a browser would send
+    data = MultiDict()
+    for key, value in record.items():
+        if isinstance(value, bool):
+            if value:
+                data.add(key, 'y')
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                data.add(key, str(item))
+        elif key == 'genres' and isinstance(value, str):
+            # CSV cells carry genres comma-separated
+            for item in value.split(','):
+                if item.strip():
+                    data.add(key, item.strip())
+        elif value is not None:
+            data.add(key, str(value))
+    return data
+
+
+@functools.lru_cache(maxsize=None)
+def boolean_fields(form_class):
+    return tuple(name for name in dir(form_class)
+                 if isinstance(getattr(form_class, name), UnboundField)
+                 and issubclass(getattr(form_class, name).field_class, BooleanField))
+
+
+def normalise_booleans(record, names):
+    # boolean columns as real booleans: BooleanField reads every string but
+    # 'false' and '' as true, so 'False', '0' or 'no' cells would turn it on
+    record = dict(record)
+    errors = {}
+    for name in names:
+        value = record.get(name)
+        if value is None or isinstance(value, bool):
+            continue
+        flag = BOOLEANS.get(str(value).strip().lower())
+        if flag is None:
+            errors[name] = ['Not a boolean: {!r}.'.format(value)]
+        else:
+            record[name] = flag
+    return record, errors
+
+
+def validate(form_class, record):
+    if isinstance(record, BadRecord):
+        return None, {'record': [record.error]}
+    if not isinstance(record, dict):
+        return None, {'record': ['Not an object: {}.'.format(reprlib.repr(record))]}
+    record, errors = normalise_booleans(record, boolean_fields(form_class))
+    if errors:
+        return None, errors
+    form = form_class(formdata=formdata(record), meta={'csrf': False})
+    if form.validate():
+        return form.data, None
+    return None, form.errors
+
+
+class ImportReport:
+    def __init__(self, kind, batch_size):
+        self.kind = kind
+        self.batch_size = batch_size
+        self.read = 0
+        self.invalid = 0
+        self.written = 0
+        self.skipped = 0
+        self.batches = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.seconds = 0.0
+
+    def reject(self, number, errors):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'record': number, 'errors': errors})
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+        return self
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'batch_size': self.batch_size,
+            'read': self.read,
+            'written': self.written,
+            'skipped': self.skipped,
+            'invalid': self.invalid,
+            'batches': self.batches,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.written / self.seconds, 1) if self.seconds else None,
+            'errors': self.errors
+        }
+
+    def __str__(self):
+        return ('{kind}: read {read}, written {written}, skipped {skipped} (duplicates or unknown '
+                'references), invalid {invalid} in {batches} batches of {batch_size}; '
+                '{seconds}s, {rows_per_second} rows/s').format(**self.to_dict())
+
+
+def run_import(kind, records, form_class, write_batch, batch_size):
+    # validate records as they stream in and write them batch by batch;
+    # write_batch(rows) returns how many rows it wrote and commits
+    report = ImportReport(kind, batch_size)
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+        rows = []
+        for record in chunk:
+            report.read += 1
+            data, errors = validate(form_class, record)
+            if errors:
+                report.reject(report.read, errors)
+            else:
+                rows.append(data)
+        if rows:
+            written = write_batch(rows)
+            report.written += written
+            report.skipped += len(rows) - written
+            report.batches += 1
+    return report.finish()
@@ -0,0 +1,142 @@
+import json
+import logging
+import threading
+import time
+
+from flask import Response, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Per-request instrumentation: wall time, number and total time of the SQL
+# statements run on any engine, and template render time. Every request is
+# logged as one JSON line on the 'fyyur.requests' logger and aggregated per
+# endpoint for the Prometheus text exposition served at /metrics.
+#
+# Streamed responses are measured up to the first chunk: the body is rendered
+# after the request has been logged.
+
+# request duration histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = {}
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.seconds = 0.0
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+    def add(self, status, seconds, sql_statements, sql_seconds, template_seconds):
+        self.requests[status] = self.requests.get(status, 0) + 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+        self.count += 1
+        self.seconds += seconds
+        self.sql_statements += sql_statements
+        self.sql_seconds += sql_seconds
+        self.template_seconds += template_seconds
+
+
+class RequestMetrics:
+    def __init__(self, app=None):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.logger = logging.getLogger('fyyur.requests')
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self.after_cursor_execute)
+        before_render_template.connect(self.before_render, app)
+        template_rendered.connect(self.after_render, app)
+
+    # request hooks
+
+    def start_request(self):
+        g.metrics_started = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+        g.template_seconds = 0.0
+
+    def finish_request(self, response):
+        if 'metrics_started' not in g:
+            return response
+        seconds = time.perf_counter() - g.metrics_started
+        endpoint = request.endpoint or 'unmatched'
+        status = str(response.status_code)
+        with self.lock:
+            stats = self.endpoints.get((endpoint, request.method))
+            if stats is None:
+                stats = self.endpoints[(endpoint, request.method)] = EndpointStats()
+            stats.add(status, seconds, g.sql_statements, g.sql_seconds, g.template_seconds)
+        self.logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'endpoint': endpoint,
+            'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 3),
+            'sql_statements': g.sql_statements,
+            'sql_ms': round(g.sql_seconds * 1000, 3),
+            'template_ms': round(g.template_seconds * 1000, 3),
+        }))
+        return response
+
+    # SQLAlchemy and template signals, only counted inside a request
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'metrics_started' in g:
+            g.sql_started = time.perf_counter()
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'sql_started' in g:
+            g.sql_statements += 1
+            g.sql_seconds += time.perf_counter() - g.pop('sql_started')
+
+    def before_render(self, sender, template, context, **extra):
+        if has_request_context() and 'metrics_started' in g:
+            g.render_started = time.perf_counter()
+
+    def after_render(self, sender, template, context, **extra):
+        if has_request_context() and 'render_started' in g:
+            g.template_seconds += time.perf_counter() - g.pop('render_started')
+
+    # exposition
+
+    def prometheus(self):
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            lines = [
+                '# HELP fyyur_requests_total Requests handled, by endpoint, method and status.',
+                '# TYPE fyyur_requests_total counter',
+            ]
+            for (endpoint, method), stats in endpoints:
+                for status, count in sorted(stats.requests.items()):
+                    lines.append('fyyur_requests_total{{endpoint="{}",method="{}",status="{}"}} {}'.format(
+                        endpoint, method, status, count))
+            lines += [
+                '# HELP fyyur_request_duration_seconds Request wall time.',
+                '# TYPE fyyur_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), stats in endpoints:
+                labels = 'endpoint="{}",method="{}"'.format(endpoint, method)
+                for bound, count in zip(BUCKETS, stats.buckets):
+                    lines.append('fyyur_request_duration_seconds_bucket{{{},le="{}"}} {}'.format(labels, bound, count))
+                lines.append('fyyur_request_duration_seconds_bucket{{{},le="+Inf"}} {}'.format(labels, stats.count))
+                lines.append('fyyur_request_duration_seconds_sum{{{}}} {}'.format(labels, stats.seconds))
+                lines.append('fyyur_request_duration_seconds_count{{{}}} {}'.format(labels, stats.count))
+            for name, help_text, attr in (
+                    ('fyyur_sql_statements_total', 'SQL statements executed while handling requests.', 'sql_statements'),
+                    ('fyyur_sql_seconds_total', 'Time spent in SQL statements while handling requests.', 'sql_seconds'),
+                    ('fyyur_template_seconds_total', 'Time spent rendering templates.', 'template_seconds')):
+                lines += ['# HELP {} {}'.format(name, help_text), '# TYPE {} counter'.format(name)]
+                for (endpoint, method), stats in endpoints:
+                    lines.append('{}{{endpoint="{}",method="{}"}} {}'.format(
+                        name, endpoint, method, getattr(stats, attr)))
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
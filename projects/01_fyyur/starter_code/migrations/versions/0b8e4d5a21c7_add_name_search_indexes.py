@@ -0,0 +1,35 @@
+"""add name search indexes
+
+Revision ID: 0b8e4d5a21c7
+Revises: 6f1d2c9a7b34
+Create Date: 2026-10-18 11:02:17.530961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b8e4d5a21c7'
+down_revision = '6f1d2c9a7b34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # trigram GIN indexes serve the ILIKE '%term%' searches and similarity()
+    # ranking; other databases fall back to the in-process index in search.py
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_Venue_name_trgm', 'Venue', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_Artist_name_trgm', 'Artist', ['name'], unique=False,
+                    postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_Artist_name_trgm', table_name='Artist')
+    op.drop_index('ix_Venue_name_trgm', table_name='Venue')
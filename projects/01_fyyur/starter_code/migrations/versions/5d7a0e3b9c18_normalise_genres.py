@@ -0,0 +1,79 @@
+"""normalise genres
+
+Revision ID: 5d7a0e3b9c18
+Revises: c3a9e71f5d02
+Create Date: 2026-10-18 12:21:06.947310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7a0e3b9c18'
+down_revision = 'c3a9e71f5d02'
+branch_labels = None
+depends_on = None
+
+genre_table = sa.table('Genre', sa.column('id', sa.Integer), sa.column('name', sa.String))
+links = (
+    ('Venue', 'venue_genres', 'venue_id'),
+    ('Artist', 'artist_genres', 'artist_id'),
+)
+
+
+def upgrade():
+    op.create_table('Genre',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    for owner, link, owner_id in links:
+        op.create_table(link,
+        sa.Column(owner_id, sa.Integer(), nullable=False),
+        sa.Column('genre_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['genre_id'], ['Genre.id'], ),
+        sa.ForeignKeyConstraint([owner_id], [owner + '.id'], ),
+        sa.PrimaryKeyConstraint(owner_id, 'genre_id')
+        )
+        op.create_index('ix_{}_genre_id'.format(link), link, ['genre_id'], unique=False)
+
+    # backfill from the comma-joined strings, then drop them
+    bind = op.get_bind()
+    genre_ids = {}
+    for owner, link, owner_id in links:
+        owner_table = sa.table(owner, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        link_table = sa.table(link, sa.column(owner_id, sa.Integer), sa.column('genre_id', sa.Integer))
+        rows = []
+        for item_id, genres in bind.execute(sa.select([owner_table.c.id, owner_table.c.genres])):
+            names = dict.fromkeys(name.strip() for name in (genres or '').split(',') if name.strip())
+            for name in names:
+                if name not in genre_ids:
+                    bind.execute(genre_table.insert().values(name=name))
+                    genre_ids[name] = bind.execute(
+                        sa.select([genre_table.c.id]).where(genre_table.c.name == name)).scalar()
+                rows.append({owner_id: item_id, 'genre_id': genre_ids[name]})
+        if rows:
+            op.bulk_insert(link_table, rows)
+        op.drop_column(owner, 'genres')
+
+
+def downgrade():
+    bind = op.get_bind()
+    op.add_column('Venue', sa.Column('genres', sa.String(length=500), nullable=True))
+    op.add_column('Artist', sa.Column('genres', sa.String(length=120), nullable=True))
+    for owner, link, owner_id in links:
+        owner_table = sa.table(owner, sa.column('id', sa.Integer), sa.column('genres', sa.String))
+        link_table = sa.table(link, sa.column(owner_id, sa.Integer), sa.column('genre_id', sa.Integer))
+        genres = {}
+        query = sa.select([link_table.c[owner_id], genre_table.c.name]) \
+            .select_from(link_table.join(genre_table, genre_table.c.id == link_table.c.genre_id)) \
+            .order_by(link_table.c[owner_id], genre_table.c.name)
+        for item_id, name in bind.execute(query):
+            genres.setdefault(item_id, []).append(name)
+        for item_id, names in genres.items():
+            bind.execute(owner_table.update().where(owner_table.c.id == item_id).values(genres=','.join(names)))
+        op.drop_index('ix_{}_genre_id'.format(link), table_name=link)
+        op.drop_table(link)
+    op.drop_table('Genre')
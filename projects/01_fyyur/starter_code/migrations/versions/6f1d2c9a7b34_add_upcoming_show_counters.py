@@ -0,0 +1,35 @@
+"""add upcoming show counters
+
+Revision ID: 6f1d2c9a7b34
+Revises: 924364404321
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1d2c9a7b34'
+down_revision = '924364404321'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('Venue', sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('Artist', sa.Column('upcoming_shows_count', sa.Integer(), server_default='0', nullable=False))
+    # backfill from the existing shows; the app keeps them current afterwards
+    op.execute(
+        'UPDATE "Venue" SET upcoming_shows_count = (SELECT count(*) FROM "Show" '
+        'WHERE "Show".venue_id = "Venue".id AND "Show".start_time > CURRENT_TIMESTAMP)'
+    )
+    op.execute(
+        'UPDATE "Artist" SET upcoming_shows_count = (SELECT count(*) FROM "Show" '
+        'WHERE "Show".artist_id = "Artist".id AND "Show".start_time > CURRENT_TIMESTAMP)'
+    )
+
+
+def downgrade():
+    op.drop_column('Artist', 'upcoming_shows_count')
+    op.drop_column('Venue', 'upcoming_shows_count')
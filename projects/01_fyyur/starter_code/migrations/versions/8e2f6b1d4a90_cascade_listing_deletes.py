@@ -0,0 +1,36 @@
+"""cascade listing deletes
+
+Revision ID: 8e2f6b1d4a90
+Revises: 5d7a0e3b9c18
+Create Date: 2026-10-18 13:05:44.381572
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e2f6b1d4a90'
+down_revision = '5d7a0e3b9c18'
+branch_labels = None
+depends_on = None
+
+# (table, constraint, column, referenced table) using PostgreSQL's default names
+foreign_keys = (
+    ('Show', 'Show_venue_id_fkey', 'venue_id', 'Venue'),
+    ('Show', 'Show_artist_id_fkey', 'artist_id', 'Artist'),
+    ('venue_genres', 'venue_genres_venue_id_fkey', 'venue_id', 'Venue'),
+    ('artist_genres', 'artist_genres_artist_id_fkey', 'artist_id', 'Artist'),
+)
+
+
+def upgrade():
+    for table, name, column, referent in foreign_keys:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referent, [column], ['id'], ondelete='CASCADE')
+
+
+def downgrade():
+    for table, name, column, referent in foreign_keys:
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referent, [column], ['id'])
@@ -0,0 +1,40 @@
+"""add the upcoming show counter watermark
+
+Revision ID: b71d3e8c0f25
+Revises: 8e2f6b1d4a90
+Create Date: 2026-10-18 16:05:12.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d3e8c0f25'
+down_revision = '8e2f6b1d4a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('CounterWatermark',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('counted_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # recount from one timestamp and record it, as `flask refresh-show-counts` does
+    op.execute('INSERT INTO "CounterWatermark" (id, counted_at) VALUES (1, LOCALTIMESTAMP)')
+    op.execute(
+        'UPDATE "Venue" SET upcoming_shows_count = (SELECT count(*) FROM "Show" '
+        'WHERE "Show".venue_id = "Venue".id AND "Show".start_time > '
+        '(SELECT counted_at FROM "CounterWatermark" WHERE id = 1))'
+    )
+    op.execute(
+        'UPDATE "Artist" SET upcoming_shows_count = (SELECT count(*) FROM "Show" '
+        'WHERE "Show".artist_id = "Artist".id AND "Show".start_time > '
+        '(SELECT counted_at FROM "CounterWatermark" WHERE id = 1))'
+    )
+
+
+def downgrade():
+    op.drop_table('CounterWatermark')
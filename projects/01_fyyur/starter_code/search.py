@@ -0,0 +1,79 @@
+import heapq
+import threading
+from collections import defaultdict
+
+# In-process trigram index over names, used for venue/artist search when the
+# database has no trigram support (e.g. SQLite test runs). PostgreSQL uses the
+# pg_trgm GIN indexes created by migration 0b8e4d5a21c7 instead.
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def rank(name, term):
+    # exact match, then prefix, then word prefix, then any substring;
+    # shorter names first within the same kind of match
+    if name == term:
+        kind = 0
+    elif name.startswith(term):
+        kind = 1
+    elif ' ' + term in name:
+        kind = 2
+    else:
+        kind = 3
+    return kind, len(name)
+
+
+class NameIndex:
+    def __init__(self):
+        self.names = {}
+        self.postings = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, item_id, name):
+        name = (name or '').lower()
+        with self.lock:
+            self._discard(item_id)
+            self.names[item_id] = name
+            for gram in trigrams(name):
+                self.postings[gram].add(item_id)
+
+    def discard(self, item_id):
+        with self.lock:
+            self._discard(item_id)
+
+    def _discard(self, item_id):
+        name = self.names.pop(item_id, None)
+        if name is None:
+            return
+        for gram in trigrams(name):
+            ids = self.postings[gram]
+            ids.discard(item_id)
+            if not ids:
+                del self.postings[gram]
+
+    def search(self, term, limit):
+        # ids of the names containing term (case-insensitive), best first
+        term = term.lower()
+        with self.lock:
+            grams = trigrams(term)
+            if grams:
+                if not all(gram in self.postings for gram in grams):
+                    return []
+                # intersect the posting lists, smallest first
+                postings = sorted((self.postings[gram] for gram in grams), key=len)
+                candidates = set(postings[0])
+                for ids in postings[1:]:
+                    candidates &= ids
+                    if not candidates:
+                        break
+            else:
+                # terms shorter than a trigram have to look at every name
+                candidates = self.names.keys()
+            matches = [(rank(self.names[item_id], term), item_id)
+                       for item_id in candidates if term in self.names[item_id]]
+        return [item_id for _, item_id in heapq.nsmallest(limit, matches)]
@@ -0,0 +1,203 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+# a throwaway SQLite database, set before config.py reads DATABASE_URL
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'test.db')
+os.environ['CACHE_TYPE'] = 'null'
+os.environ['REQUEST_LOG'] = 'false'
+
+from app import (app, db, Venue, Artist, Show, CounterWatermark, advance_upcoming_show_counts, count_new_show,
+                 name_indexes, refresh_upcoming_show_counts, search_by_name, started_since_count, venue_directory)
+
+
+class AppTestCase(unittest.TestCase):
+    """A fresh database with one venue and one artist per test"""
+
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['WTF_CSRF_ENABLED'] = False
+        self.client = app.test_client()
+        self.context = app.app_context()
+        self.context.push()
+        db.drop_all()
+        db.create_all()
+        self.venue = Venue(name='The Musical Hop', city='San Francisco', state='CA', address='1015 Folsom Street')
+        self.artist = Artist(name='Guns N Petals', city='San Francisco', state='CA')
+        db.session.add_all([self.venue, self.artist])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        self.context.pop()
+
+    def stored_count(self, model, item_id):
+        # the counter column as stored, not a stale instance of this session
+        return db.session.query(model.upcoming_shows_count).filter(model.id == item_id).scalar()
+
+    def create_show(self, start_time):
+        return self.client.post('/shows/create', data={
+            'venue_id': self.venue.id, 'artist_id': self.artist.id, 'start_time': start_time})
+
+
+class ShowStartTimeTestCase(AppTestCase):
+    """Start times with a UTC offset are stored as naive UTC"""
+
+    def test_create_show_with_offset(self):
+        res = self.create_show('2031-05-21T21:30:00.000Z')
+        self.assertIn(b'Show was successfully listed!', res.data)
+        show = Show.query.one()
+        self.assertEqual(show.start_time, datetime(2031, 5, 21, 21, 30))
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 1)
+
+    def test_offset_converted_to_utc(self):
+        self.create_show('2031-05-21T21:30:00+02:00')
+        self.assertEqual(Show.query.one().start_time, datetime(2031, 5, 21, 19, 30))
+
+    def test_naive_time_kept(self):
+        start_time = datetime.now().replace(microsecond=0) + timedelta(days=3)
+        self.create_show(start_time.strftime('%Y-%m-%d %H:%M:%S'))
+        self.assertEqual(Show.query.one().start_time, start_time)
+
+
+class ShowImportTestCase(AppTestCase):
+    """Bulk import of shows"""
+
+    def import_shows(self, body):
+        return self.client.post('/import/shows', data=body, content_type='application/x-ndjson')
+
+    def test_import_start_time_with_offset(self):
+        res = self.import_shows('{{"venue_id": {}, "artist_id": {}, "start_time": "2032-01-01T20:00:00Z"}}\n'.format(
+            self.venue.id, self.artist.id))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json['written'], 1)
+        self.assertEqual(Show.query.one().start_time, datetime(2032, 1, 1, 20, 0))
+        self.assertEqual(self.stored_count(Artist, self.artist.id), 1)
+
+    def test_import_skips_stored_shows(self):
+        body = ''.join('{{"venue_id": {}, "artist_id": {}, "start_time": "2032-01-0{} 20:00"}}\n'.format(
+            self.venue.id, self.artist.id, day) for day in (1, 2, 2, 3))
+        first = self.import_shows(body).json
+        self.assertEqual((first['written'], first['skipped']), (3, 1))
+        second = self.import_shows(body).json
+        self.assertEqual((second['written'], second['skipped']), (0, 4))
+        self.assertEqual(Show.query.count(), 3)
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 3)
+
+    def test_import_reports_unreadable_lines(self):
+        def good(day):
+            return '{{"venue_id": {}, "artist_id": {}, "start_time": "2032-01-0{} 20:00"}}\n'.format(
+                self.venue.id, self.artist.id, day)
+        res = self.client.post('/import/shows?batch_size=2',
+                               data=good(1) + good(2) + '[1, 2]\n{"venue_id": \n' + good(3),
+                               content_type='application/x-ndjson')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual((res.json['read'], res.json['written'], res.json['invalid']), (5, 3, 2))
+        self.assertEqual([error['record'] for error in res.json['errors']], [3, 4])
+
+
+class UpcomingCounterTestCase(AppTestCase):
+    """Stored upcoming show counters and their watermark"""
+
+    def watermark(self):
+        return db.session.query(CounterWatermark.counted_at).filter(CounterWatermark.id == 1).scalar()
+
+    def set_watermark(self, counted_at):
+        db.session.query(CounterWatermark).update({CounterWatermark.counted_at: counted_at})
+        db.session.commit()
+
+    def add_show(self, start_time):
+        # as the create handler does: insert and count it from the watermark
+        db.session.add(Show(venue_id=self.venue.id, artist_id=self.artist.id, start_time=start_time))
+        count_new_show(start_time, self.venue.id, self.artist.id)
+        db.session.commit()
+
+    def directory_count(self, current_time):
+        return venue_directory(current_time)[0]['venues'][0]['num_upcoming_shows']
+
+    def test_watermark_created_with_tables(self):
+        self.assertLessEqual(self.watermark(), datetime.now())
+        self.assertGreater(self.watermark(), datetime.now() - timedelta(minutes=1))
+
+    def test_missing_watermark_created_by_write(self):
+        db.session.query(CounterWatermark).delete()
+        db.session.commit()
+        self.create_show((datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d %H:%M'))
+        self.assertIsNotNone(self.watermark())
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 1)
+
+    def test_started_show_subtracted_on_read(self):
+        now = datetime.now()
+        self.set_watermark(now - timedelta(hours=2))
+        self.add_show(now - timedelta(hours=1))
+        self.add_show(now + timedelta(hours=1))
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 2)
+        self.assertEqual(started_since_count(Venue, now), {self.venue.id: 1})
+        self.assertEqual(self.directory_count(now), 1)
+
+    def test_advance_applies_the_window(self):
+        now = datetime.now()
+        self.set_watermark(now - timedelta(hours=2))
+        self.add_show(now - timedelta(hours=1))
+        self.add_show(now + timedelta(hours=1))
+        self.assertTrue(advance_upcoming_show_counts(now))
+        self.assertEqual(self.watermark(), now)
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 1)
+        self.assertEqual(self.stored_count(Artist, self.artist.id), 1)
+        self.assertEqual(started_since_count(Venue, now), {})
+        self.assertEqual(self.directory_count(now), 1)
+
+    def test_advance_only_forward(self):
+        now = datetime.now()
+        self.set_watermark(now - timedelta(hours=2))
+        self.add_show(now - timedelta(hours=1))
+        self.assertTrue(advance_upcoming_show_counts(now))
+        self.assertFalse(advance_upcoming_show_counts(now))
+        self.assertFalse(advance_upcoming_show_counts(now - timedelta(minutes=5)))
+        self.assertEqual(self.watermark(), now)
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 0)
+
+    def test_advance_without_watermark(self):
+        db.session.query(CounterWatermark).delete()
+        db.session.commit()
+        self.assertFalse(advance_upcoming_show_counts(datetime.now()))
+        self.assertIsNotNone(self.watermark())
+
+    def test_refresh_recounts(self):
+        now = datetime.now()
+        db.session.add(Show(venue_id=self.venue.id, artist_id=self.artist.id, start_time=now + timedelta(days=1)))
+        db.session.commit()
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 0)
+        refresh_upcoming_show_counts(now)
+        self.assertEqual(self.stored_count(Venue, self.venue.id), 1)
+        self.assertEqual(self.watermark(), now)
+
+
+class DeleteListingsTestCase(AppTestCase):
+    """Deleting listings updates the name index only once committed"""
+
+    def setUp(self):
+        super().setUp()
+        name_indexes.clear()
+
+    def found(self):
+        return [row.id for row in search_by_name(Venue, 'musical', 10)]
+
+    def test_delete_drops_indexed_name(self):
+        self.assertEqual(self.found(), [self.venue.id])
+        res = self.client.post('/listings/delete', json={'venue_ids': [self.venue.id]})
+        self.assertEqual(res.json['deleted']['venues'], 1)
+        self.assertEqual(self.found(), [])
+
+    def test_failed_commit_keeps_indexed_name(self):
+        self.assertEqual(self.found(), [self.venue.id])
+        with mock.patch.object(db.session, 'commit', side_effect=RuntimeError('commit failed')):
+            res = self.client.post('/listings/delete', json={'venue_ids': [self.venue.id]})
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual(self.found(), [self.venue.id])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import io
+import unittest
+
+from flask import Flask
+
+from forms import ArtistForm, VenueForm
+from importer import read_records, validate
+
+
+class ImportBooleanTestCase(unittest.TestCase):
+    """Boolean CSV cells of the bulk import"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.context = self.app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        self.context.pop()
+
+    def artist(self, seeking_venue):
+        return {'name': 'The Wild Sax Band', 'city': 'San Francisco', 'state': 'CA', 'phone': '432-325-5432',
+                'genres': 'Jazz,Classical', 'seeking_venue': seeking_venue}
+
+    def test_false_spellings(self):
+        for value in ('False', 'FALSE', 'false', '0', 'no', 'No', 'n', ''):
+            data, errors = validate(ArtistForm, self.artist(value))
+            self.assertIsNone(errors, value)
+            self.assertIs(data['seeking_venue'], False, value)
+
+    def test_true_spellings(self):
+        for value in ('True', 'true', '1', 'yes', 'YES', 'y', True, 1):
+            data, errors = validate(ArtistForm, self.artist(value))
+            self.assertIsNone(errors, value)
+            self.assertIs(data['seeking_venue'], True, value)
+
+    def test_invalid_boolean_is_a_row_error(self):
+        data, errors = validate(ArtistForm, self.artist('maybe'))
+        self.assertIsNone(data)
+        self.assertIn('seeking_venue', errors)
+
+    def test_csv_rows(self):
+        rows = read_records(iter([
+            'name,city,state,address,genres,seeking_talent\n',
+            'The Musical Hop,San Francisco,CA,1015 Folsom Street,Jazz,False\n',
+            'Park Square Live Music & Coffee,San Francisco,CA,34 Whiskey Moore Ave,Folk,1\n',
+        ]), 'csv')
+        flags = [validate(VenueForm, row)[0]['seeking_talent'] for row in rows]
+        self.assertEqual(flags, [False, True])
+
+
+class ImportRecordTestCase(unittest.TestCase):
+    """Records that cannot be read are row errors, not a failed import"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.context = self.app.app_context()
+        self.context.push()
+
+    def tearDown(self):
+        self.context.pop()
+
+    def test_json_lines(self):
+        lines = ['{"name": "The Wild Sax Band", "city": "San Francisco", "state": "CA", "genres": ["Jazz"]}\n',
+                 '[1, 2]\n', '{"name": \n', '\n', '"text"\n']
+        results = [validate(ArtistForm, record) for record in read_records(iter(lines), 'jsonl')]
+        self.assertEqual(len(results), 4)
+        self.assertIsNone(results[0][1])
+        for data, errors in results[1:]:
+            self.assertIsNone(data)
+            self.assertEqual(list(errors), ['record'])
+
+    def test_json_array_elements(self):
+        data, errors = validate(ArtistForm, next(read_records(io.StringIO('[null]'), 'json')))
+        self.assertIsNone(data)
+        self.assertIn('Not an object', errors['record'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""Random unseen quiz question selection over a large question bank.
+
+Compares the original /quizzes selection (every question of the category
+materialised, previous_questions filtered with a list scan, random.choice on
+the rest) with quiz.QuestionPool.pick() (cached id array, set exclusion,
+random draws) on an in-memory bank of question ids, for quiz sessions of
+growing length. Run from the backend directory:
+
+    python -m benchmarks.quiz_selection [questions] [categories]
+"""
+import random
+import sys
+import timeit
+
+from quiz import QuestionPool
+
+
+def legacy_pick(questions, previous_questions):
+    filtered_questions = []
+    for question in questions:
+        if question not in previous_questions:
+            filtered_questions.append(question)
+    return None if len(filtered_questions) == 0 else random.choice(filtered_questions)
+
+
+def best(fn, number, repeat=3):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main(questions=1000000, categories=6):
+    rng = random.Random(1)
+    bank = {category: [] for category in range(1, categories + 1)}
+    for question_id in range(1, questions + 1):
+        bank[rng.randint(1, categories)].append(question_id)
+    bank[0] = list(range(1, questions + 1))
+    pool = QuestionPool(lambda category: bank[category], rng=rng)
+
+    for category in (0, 1):
+        ids = bank[category]
+        print('category {} ({} questions)'.format(category, len(ids)))
+        for session in (0, 10, 100, 1000, 10000):
+            previous_questions = rng.sample(ids, session)
+            seen = set(previous_questions)
+            fast = best(lambda: pool.pick(category, seen), 1000)
+            # the list scan is O(n * m), time a single call for long sessions
+            legacy = best(lambda: legacy_pick(ids, previous_questions), 1, repeat=1) if session <= 100 else None
+            print('  {:>6} seen  pool {:8.2f} us   legacy {}'.format(
+                session, fast * 1e6, '{:10.1f} ms'.format(legacy * 1000) if legacy else '   skipped'))
+
+    # a whole quiz through a small category: every question exactly once
+    small = bank[1][:2000]
+    pool = QuestionPool(lambda category: small, rng=rng)
+    seen = set()
+    started = timeit.default_timer()
+    while True:
+        question_id = pool.pick(1, seen)
+        if question_id is None:
+            break
+        seen.add(question_id)
+    assert seen == set(small)
+    print('full quiz over {} questions: {:.1f} ms'.format(len(small), (timeit.default_timer() - started) * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
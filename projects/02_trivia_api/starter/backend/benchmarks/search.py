@@ -0,0 +1,61 @@
+"""Question search over a large question bank without the PostgreSQL index.
+
+Compares a scan of every question for the term (what ILIKE '%term%' does
+without an index) with search.QuestionSearch, the trigram index used when the
+database is not PostgreSQL, on generated question texts. Run from the backend
+directory:
+
+    python -m benchmarks.search [questions]
+"""
+import itertools
+import random
+import sys
+import timeit
+
+from search import QuestionSearch
+
+SYLLABLES = ('ka', 'lo', 'mi', 'ran', 'te', 'vo', 'shi', 'du', 'ne', 'por', 'al', 'ex', 'ti', 'gu', 'bre', 'son')
+
+
+def vocabulary(rng, size=20000):
+    return [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)]
+
+
+def scan(documents, term):
+    term = term.casefold()
+    return [question_id for question_id, question, answer in documents
+            if term in question.casefold() or term in answer.casefold()]
+
+
+def best(fn, number, repeat=3):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main(questions=200000):
+    rng = random.Random(1)
+    words = vocabulary(rng)
+    # a few common words and many rare ones, as in natural text; cumulative
+    # weights once here, not summed again on every choices() call
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+    def text(low, high):
+        return ' '.join(rng.choices(words, cum_weights=weights, k=rng.randint(low, high)))
+
+    documents = [(question_id,
+                  text(6, 14) + '?', text(1, 3))
+                 for question_id in range(1, questions + 1)]
+    index = QuestionSearch(lambda: documents)
+    started = timeit.default_timer()
+    index.current()
+    print('index of {} questions built in {:.2f} s'.format(questions, timeit.default_timer() - started))
+
+    for term in (words[0], words[10] + ' ' + words[20], words[500], words[5000], 'zebra'):
+        matches = len(scan(documents, term))
+        indexed = best(lambda: index.search(term, 100), 10)
+        scanned = best(lambda: scan(documents, term), 1)
+        print('{:22} {:>7} matches  index {:8.2f} ms   scan {:8.2f} ms'.format(
+            repr(term), matches, indexed * 1000, scanned * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
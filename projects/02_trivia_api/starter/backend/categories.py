@@ -0,0 +1,58 @@
+import hashlib
+import json
+import threading
+import time
+
+'''
+CategoryRegistry
+    the category map of this process, loaded with load_categories() (rows of
+    id and type) and kept until ttl seconds have passed or invalidate() is
+    called after a write. Each load is a new snapshot with its own version,
+    the /categories response body is serialised once per snapshot and its
+    ETag is a digest of that body, so it only changes with the categories.
+'''
+class CategorySnapshot:
+  __slots__ = ('types', 'version', 'body', 'etag', 'expires')
+
+  def __init__(self, rows, version, expires):
+    self.types = {category_id: category_type for category_id, category_type in rows}
+    self.version = version
+    self.body = json.dumps(
+      {'success': True, 'categories': {str(category_id): category_type
+                                       for category_id, category_type in sorted(self.types.items())}},
+      separators=(',', ':')) + '\n'
+    self.etag = hashlib.sha1(self.body.encode('utf-8')).hexdigest()
+    self.expires = expires
+
+
+class CategoryRegistry:
+  def __init__(self, load_categories, ttl=300):
+    self.load_categories = load_categories
+    self.ttl = ttl
+    self.lock = threading.Lock()
+    self.version = 0
+    self.snapshot = None
+
+  def load(self):
+    rows = list(self.load_categories())
+    with self.lock:
+      self.version += 1
+      self.snapshot = CategorySnapshot(rows, self.version, time.monotonic() + self.ttl)
+      return self.snapshot
+
+  def current(self):
+    snapshot = self.snapshot
+    if snapshot is None or time.monotonic() >= snapshot.expires:
+      snapshot = self.load()
+    return snapshot
+
+  def invalidate(self):
+    with self.lock:
+      self.snapshot = None
+
+  def types(self):
+    # {id: type} of every category; shared, do not modify
+    return self.current().types
+
+  def __contains__(self, category_id):
+    return category_id in self.current().types
@@ -0,0 +1,31 @@
+"""Create the full-text index of question search on a PostgreSQL database.
+
+A one-off command, run after restoring trivia.psql (or when deploying a new
+database) instead of at server startup: the index is built with CREATE INDEX
+CONCURRENTLY, which does not block writes to the questions table. Run from the
+backend directory:
+
+    python create_search_index.py [database_url]
+
+The database defaults to DATABASE_URL, as for the server.
+"""
+import sys
+
+from sqlalchemy import create_engine
+
+from models import create_search_index, database_path
+
+
+def main(url=database_path):
+    engine = create_engine(url)
+    if engine.dialect.name != 'postgresql':
+        print('{} is not PostgreSQL; questions are searched in memory there'.format(engine.dialect.name))
+    elif create_search_index(engine):
+        print('questions_search_idx created')
+    else:
+        print('questions_search_idx already exists')
+    engine.dispose()
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -1,18 +1,116 @@
 import os
+import re
 from flask import Flask, request, abort, jsonify, flash
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-import random
+from sqlalchemy import func
+import time
 
-from models import setup_db, Question, Category
+from models import setup_db, db, Question, Category, SEARCH_CONFIG, search_document
+from dbpool import pool_stats
+from quiz import QuestionPool, QuizSessions
+from categories import CategoryRegistry
+from search import QuestionSearch
 
 QUESTIONS_PER_PAGE = 10
+MAX_QUESTIONS_PER_PAGE = 100
+# seconds a total question count is reused before counting again
+QUESTION_COUNT_TTL = 10
+# seconds an unused quiz session is kept, and how many are kept at most
+QUIZ_SESSION_TTL = 1800
+MAX_QUIZ_SESSIONS = 10000
+# most questions a search ranks and pages through
+MAX_SEARCH_RESULTS = 100
+# seconds the in-memory search index is used before it is rebuilt
+SEARCH_INDEX_TTL = 60
+# seconds the category map is reused before it is read again
+CATEGORY_TTL = 300
+
+def page_bounds():
+  # ?page= and ?per_page= of the request as list slice bounds
+  per_page = request.args.get('per_page', QUESTIONS_PER_PAGE, type=int)
+  per_page = max(1, min(per_page, MAX_QUESTIONS_PER_PAGE))
+  page = max(request.args.get('page', 1, type=int), 1)
+  return (page - 1) * per_page, page * per_page
+
+def paginate_questions(query):
+  # one page of questions in id order: ?page= fetches it with LIMIT/OFFSET,
+  # ?after_id= continues after the last question seen without an OFFSET scan.
+  # Returns the formatted page and the after_id of the next page, if any
+  start, end = page_bounds()
+  per_page = end - start
+  after_id = request.args.get('after_id', None, type=int)
+  query = query.order_by(Question.id)
+  if after_id is not None:
+    query = query.filter(Question.id > after_id)
+  else:
+    query = query.offset(start)
+  questions = query.limit(per_page).all()
+  next_after_id = questions[-1].id if len(questions) == per_page else None
+  return [question.format() for question in questions], next_after_id
 
 def create_app(test_config=None):
   # create and configure the app
   app = Flask(__name__)
   setup_db(app)
   CORS(app)
+
+  # categories of this process, read once here and again every CATEGORY_TTL
+  # or after categories.invalidate()
+  categories = CategoryRegistry(
+    lambda: db.session.query(Category.id, Category.type), CATEGORY_TTL)
+  with app.app_context():
+    categories.load()
+
+  # total number of questions, counted at most once per QUESTION_COUNT_TTL
+  # and recounted after this process adds or deletes a question
+  question_count = {'value': None, 'expires': 0}
+
+  def total_questions():
+    now = time.monotonic()
+    if question_count['value'] is None or now >= question_count['expires']:
+      question_count['value'] = Question.query.count()
+      question_count['expires'] = now + QUESTION_COUNT_TTL
+    return question_count['value']
+
+  def question_ids(category_id):
+    # ids of the questions of one category, or of all of them for 0
+    query = db.session.query(Question.id)
+    if category_id != 0:
+      query = query.filter(Question.category == str(category_id))
+    return [question_id for question_id, in query]
+
+  # question ids per category for the quiz, refreshed after this process
+  # writes questions and at least every minute
+  question_pool = QuestionPool(question_ids)
+  # server-side quizzes of this process, each a deck over a snapshot of the
+  # pool's ids; questions deleted since the snapshot are skipped
+  quiz_sessions = QuizSessions(QUIZ_SESSION_TTL, MAX_QUIZ_SESSIONS)
+
+  # trigram index of question texts, for databases other than PostgreSQL
+  question_search = QuestionSearch(
+    lambda: db.session.query(Question.id, Question.question, Question.answer), SEARCH_INDEX_TTL)
+
+  def search_question_ids(search_term):
+    # ids of the best MAX_SEARCH_RESULTS questions matching the term, best
+    # first: on PostgreSQL every word of the term is a word prefix looked up
+    # in the full-text index, elsewhere the term is a substring
+    if db.engine.dialect.name != 'postgresql':
+      return question_search.search(search_term, MAX_SEARCH_RESULTS)
+    words = re.findall(r'[^\W_]+', search_term)
+    if not words:
+      return []
+    query = func.to_tsquery(SEARCH_CONFIG, ' & '.join(word + ':*' for word in words))
+    document = search_document()
+    matches = db.session.query(Question.id).filter(document.op('@@')(query)) \
+                .order_by(func.ts_rank(document, query).desc(), Question.id) \
+                .limit(MAX_SEARCH_RESULTS)
+    return [question_id for question_id, in matches]
+
+  def questions_changed():
+    question_count['value'] = None
+    question_pool.invalidate()
+    question_search.invalidate()
   
   @app.after_request
   def after_request(response):
@@ -22,47 +120,49 @@ def create_app(test_config=None):
 
   @app.route('/categories', methods=['GET'])
   def get_categories():
-    # return all categories
-    categories = Category.query.all()
-    return jsonify({
-      'success': True,
-      'categories': {category.id: category.type for category in categories}
-    })
+    # return all categories from the serialised map, 304 when the
+    # client's If-None-Match ETag is still current
+    snapshot = categories.current()
+    response = app.response_class(snapshot.body, mimetype='application/json')
+    response.set_etag(snapshot.etag)
+    return response.make_conditional(request)
 
   @app.route('/questions', methods=['GET'])
   def get_questions():
-    # return paginated questions list
-    page = request.args.get('page', 1, type=int)
-    start = (page-1) * QUESTIONS_PER_PAGE
-    end = start + QUESTIONS_PER_PAGE
-    questions = Question.query.all()
-    formatted_questions = [question.format() for question in questions]
-    categories = Category.query.all()
+    # return paginated questions list, fetching only the requested page
+    formatted_questions, next_after_id = paginate_questions(Question.query)
     return jsonify({
       'success': True,
-      'questions': formatted_questions[start:end],
-      'total_questions': len(questions),
+      'questions': formatted_questions,
+      'total_questions': total_questions(),
+      'next_after_id': next_after_id,
       'current_category': None,
-      'categories': {category.id: category.type for category in categories}
+      'categories': categories.types()
     })
 
   @app.route('/questions/search', methods=['POST'])
   def search_questions():    
-    # return questions list based on search term
-    body = request.get_json()
-    search_term = body.get('searchTerm', None)
-    questions = Question.query.filter(Question.question.ilike(r'%{}%'.format(search_term))).all()
-    formatted_questions = [question.format() for question in questions]
+    # return one page of the questions best matching the search term
+    body = request.get_json() or {}
+    search_term = (body.get('searchTerm', None) or '').strip()
+    ids = search_question_ids(search_term) if search_term else []
+    start, end = page_bounds()
+    page_ids = ids[start:end]
+    questions = {}
+    if page_ids:
+      questions = {question.id: question for question in Question.query.filter(Question.id.in_(page_ids))}
     return jsonify({
       'success': True,
-      'questions': formatted_questions
+      # in rank order, without questions deleted since they were indexed
+      'questions': [questions[question_id].format() for question_id in page_ids if question_id in questions],
+      'total_questions': len(ids),
+      'current_category': None
     })
 
   @app.route('/categories/<int:category_id>/questions', methods=['GET'])
   def get_questions_by_category(category_id):
     # return questions list having category id == input id
-    categories = Category.query.all()
-    if category_id not in [category.id for category in categories]:
+    if category_id not in categories:
       abort(404, 'category number not found')
 
     questions = Question.query.filter_by(category=category_id).all()
@@ -95,6 +195,7 @@ def create_app(test_config=None):
       question = Question(question=new_question, answer=new_answer, 
                     category=new_category, difficulty=new_difficulty)
       question.insert()
+      questions_changed()
       new_id = question.get_last_id()
       return jsonify({
         'success': True,
@@ -114,6 +215,7 @@ def create_app(test_config=None):
 
     try:
       question.delete()
+      questions_changed()
       return jsonify({
         'success': True,
         'deleted': question_id
@@ -129,21 +231,81 @@ def create_app(test_config=None):
     body = request.get_json()
     previous_questions = body.get('previous_questions', [])
     quiz_category = body.get('quiz_category', None)
-    categories = Category.query.all()
     quiz_category_id = int(quiz_category['id'])
-    if quiz_category_id != 0 and quiz_category_id not in [category.id for category in categories]:
+    if quiz_category_id != 0 and quiz_category_id not in categories:
+      abort(422, 'quiz_category is invalid')
+
+    # draw a random unseen id from the cached ids, then load only that question;
+    # an id deleted meanwhile by another process refreshes the pool once
+    try:
+      seen = {int(question_id) for question_id in previous_questions}
+    except (TypeError, ValueError):
+      abort(422, 'previous_questions is invalid')
+    question = None
+    for attempt in range(2):
+      question_id = question_pool.pick(quiz_category_id, seen)
+      if question_id is None:
+        break
+      question = Question.query.get(question_id)
+      if question is not None:
+        break
+      question_pool.invalidate()
+    return jsonify({
+      'success': True,
+      'question': question.format() if question is not None else None
+    })
+
+  @app.route('/quizzes/sessions', methods=['POST'])
+  def create_quiz_session():
+    # start a quiz over one category (0 for all), its questions shuffled once
+    body = request.get_json() or {}
+    quiz_category = body.get('quiz_category', None) or {'id': 0}
+    try:
+      quiz_category_id = int(quiz_category['id'])
+    except (KeyError, TypeError, ValueError):
+      abort(422, 'quiz_category is invalid')
+    if quiz_category_id != 0 and quiz_category_id not in categories:
       abort(422, 'quiz_category is invalid')
+    session_id, session = quiz_sessions.create(question_pool.ids(quiz_category_id))
+    return jsonify({
+      'success': True,
+      'session_id': session_id,
+      'total_questions': session.remaining
+    })
+
+  @app.route('/quizzes/sessions/<session_id>/next', methods=['POST'])
+  def next_quiz_question(session_id):
+    # the next question of the session's deck, None once the deck is done
+    question = None
+    try:
+      while question is None:
+        question_id = quiz_sessions.next_question(session_id)
+        if question_id is None:
+          break
+        question = Question.query.get(question_id)
+    except KeyError:
+      abort(404, 'quiz session not found')
+    return jsonify({
+      'success': True,
+      'question': question.format() if question is not None else None
+    })
+
+  @app.route('/quizzes/sessions/<session_id>', methods=['DELETE'])
+  def finish_quiz_session(session_id):
+    session = quiz_sessions.finish(session_id)
+    if session is None:
+      abort(404, 'quiz session not found')
+    return jsonify({
+      'success': True,
+      'asked': session.asked
+    })
 
-    questions = Question.query.all() if quiz_category_id == 0 else Question.query.filter_by(category=quiz_category['id']).all()
-    filtered_questions = []
-    for question in questions:
-      if question.id not in previous_questions:
-        filtered_questions.append(question)
-    random_question = None if len(filtered_questions) == 0 else random.choice(filtered_questions).format()
-    #print(random_question)
+  @app.route('/pool/stats', methods=['GET'])
+  def get_pool_stats():
+    # checkouts, hold time and overflow of the database connection pool
     return jsonify({
       'success': True,
-      'question': random_question
+      'pool': pool_stats(db.engine)
     })
 
   @app.errorhandler(400)
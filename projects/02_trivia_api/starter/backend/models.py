@@ -1,10 +1,13 @@
 import os
-from sqlalchemy import Column, String, Integer, create_engine
+from sqlalchemy import Column, String, Integer, create_engine, func, literal_column, text
 from flask_sqlalchemy import SQLAlchemy
 import json
 
+from dbpool import engine_options, instrument_pool
+
 database_name = "trivia_test"
-database_path = "postgresql://postgres:postgres@{}/{}".format('localhost:5432', database_name)
+database_path = os.environ.get('DATABASE_URL',
+    "postgresql://postgres:postgres@{}/{}".format('localhost:5432', database_name))
 
 db = SQLAlchemy()
 
@@ -15,9 +18,12 @@ setup_db(app)
 def setup_db(app, database_path=database_path):
     app.config["SQLALCHEMY_DATABASE_URI"] = database_path
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # pool sizing and statement timeout from DB_* variables, see dbpool.py
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_path)
     db.app = app
     db.init_app(app)
     db.create_all()
+    instrument_pool(db.engine)
 
 '''
 Question
@@ -80,4 +86,48 @@ class Category(db.Model):
     return {
       'id': self.id,
       'type': self.type
-    }
\ No newline at end of file
+    }
+
+'''
+search_document()
+    the weighted text search vector of a question, its question text ranked
+    above its answer. The 'simple' configuration has no stemming or stop
+    words, so every word of the trivia can be searched for. Must stay the
+    expression indexed by SEARCH_INDEX_DDL for PostgreSQL to use the index.
+'''
+SEARCH_CONFIG = literal_column("'simple'")
+
+SEARCH_INDEX_DDL = '''
+CREATE INDEX CONCURRENTLY questions_search_idx ON questions USING gin ((
+  setweight(to_tsvector('simple', coalesce(question, '')), 'A') ||
+  setweight(to_tsvector('simple', coalesce(answer, '')), 'B')))
+'''
+
+def search_document():
+    def weighted(column, weight):
+        return func.setweight(
+            func.to_tsvector(SEARCH_CONFIG, func.coalesce(column, literal_column("''"))),
+            literal_column("'{}'".format(weight)))
+    return weighted(Question.question, 'A').op('||')(weighted(Question.answer, 'B'))
+
+'''
+create_search_index(engine)
+    creates the full-text index of question search on PostgreSQL, run once
+    per database by create_search_index.py, never at startup. CONCURRENTLY
+    keeps the questions table writable during the build but cannot run in a
+    transaction, hence autocommit; an invalid index left by a failed build is
+    dropped and built again. Returns whether an index was built; other
+    databases are searched in memory, see search.py
+'''
+def create_search_index(engine):
+    if engine.dialect.name != 'postgresql':
+        return False
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        valid = connection.execute(text(
+            "SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('questions_search_idx')")).scalar()
+        if valid:
+            return False
+        if valid is not None:
+            connection.execute(text('DROP INDEX CONCURRENTLY questions_search_idx'))
+        connection.execute(text(SEARCH_INDEX_DDL))
+    return True
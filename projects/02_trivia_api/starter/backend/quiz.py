@@ -0,0 +1,129 @@
+import random
+import secrets
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+'''
+QuestionPool
+    question ids per category (0 for all categories) kept in compact arrays,
+    loaded with load_ids(category) on first use and again after ttl seconds or
+    invalidate(). pick() draws a random id that is not excluded in expected
+    O(1) time: it samples random positions and only builds the list of
+    remaining ids once most of the category has been excluded.
+'''
+class QuestionPool:
+  # random draws before falling back to listing the remaining ids
+  MAX_DRAWS = 16
+
+  def __init__(self, load_ids, ttl=60, rng=None):
+    self.load_ids = load_ids
+    self.ttl = ttl
+    self.rng = rng or random.Random()
+    self.lock = threading.Lock()
+    self.categories = {}
+
+  def ids(self, category):
+    now = time.monotonic()
+    with self.lock:
+      cached = self.categories.get(category)
+      if cached is not None and now < cached[0]:
+        return cached[1]
+    ids = array('q', self.load_ids(category))
+    with self.lock:
+      self.categories[category] = (now + self.ttl, ids)
+    return ids
+
+  def invalidate(self):
+    with self.lock:
+      self.categories.clear()
+
+  def pick(self, category, exclude=()):
+    # a random id of the category not in exclude (a set), or None
+    ids = self.ids(category)
+    if not ids:
+      return None
+    if len(exclude) < len(ids):
+      for _ in range(self.MAX_DRAWS):
+        question_id = ids[self.rng.randrange(len(ids))]
+        if question_id not in exclude:
+          return question_id
+    remaining = [question_id for question_id in ids if question_id not in exclude]
+    return self.rng.choice(remaining) if remaining else None
+
+'''
+QuizSessions
+    server-side quiz sessions, each a deck of question ids shuffled lazily:
+    next_question() is one Fisher-Yates step over a shared snapshot of the
+    ids, remembering only the positions it swapped, so a session costs O(1)
+    per question and memory in proportion to the questions asked. Sessions
+    unused for ttl seconds are evicted, as are the least recently used ones
+    beyond max_sessions.
+'''
+class QuizSession:
+  __slots__ = ('ids', 'remaining', 'swaps', 'asked', 'used')
+
+  def __init__(self, ids):
+    self.ids = ids
+    self.remaining = len(ids)
+    self.swaps = {}
+    self.asked = 0
+    self.used = time.monotonic()
+
+
+class QuizSessions:
+  def __init__(self, ttl=1800, max_sessions=10000, rng=None):
+    self.ttl = ttl
+    self.max_sessions = max_sessions
+    self.rng = rng or random.SystemRandom()
+    self.lock = threading.Lock()
+    self.sessions = OrderedDict()
+
+  def evict(self, now):
+    while self.sessions:
+      session_id, session = next(iter(self.sessions.items()))
+      if len(self.sessions) <= self.max_sessions and now - session.used < self.ttl:
+        break
+      del self.sessions[session_id]
+
+  def create(self, ids):
+    session_id = secrets.token_urlsafe(16)
+    session = QuizSession(ids)
+    with self.lock:
+      self.sessions[session_id] = session
+      self.evict(session.used)
+    return session_id, session
+
+  def get(self, session_id):
+    # the live session, or None when unknown or expired
+    now = time.monotonic()
+    with self.lock:
+      self.evict(now)
+      session = self.sessions.get(session_id)
+      if session is not None:
+        session.used = now
+        self.sessions.move_to_end(session_id)
+      return session
+
+  def next_question(self, session_id):
+    # the next question id of the deck, None once it is exhausted;
+    # KeyError for an unknown or expired session
+    session = self.get(session_id)
+    if session is None:
+      raise KeyError(session_id)
+    with self.lock:
+      if not session.remaining:
+        return None
+      last = session.remaining - 1
+      position = self.rng.randrange(session.remaining)
+      question_id = session.swaps.get(position, session.ids[position])
+      session.swaps[position] = session.swaps.pop(last, session.ids[last])
+      session.remaining = last
+      session.asked += 1
+      return question_id
+
+  def finish(self, session_id):
+    # end a session, returning it (None when unknown or expired)
+    with self.lock:
+      return self.sessions.pop(session_id, None)
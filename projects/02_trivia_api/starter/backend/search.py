@@ -0,0 +1,83 @@
+import heapq
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+'''
+QuestionSearch
+    substring search over question and answer texts for databases without
+    the PostgreSQL full-text index (SQLite in tests). load_documents() returns
+    rows of id, question and answer; they are indexed by their trigrams on
+    first use and again after ttl seconds or invalidate(). A search only reads
+    the questions holding the rarest trigram of the term, then ranks the matches:
+    a match in the question before one in the answer only, earlier and in a
+    shorter text first.
+'''
+class QuestionSearch:
+  N = 3
+
+  def __init__(self, load_documents, ttl=60):
+    self.load_documents = load_documents
+    self.ttl = ttl
+    self.lock = threading.Lock()
+    self.index = None
+
+  @classmethod
+  def grams(cls, text):
+    return {text[i:i + cls.N] for i in range(len(text) - cls.N + 1)}
+
+  def build(self):
+    documents = {}
+    postings = defaultdict(list)
+    for question_id, question, answer in self.load_documents():
+      question, answer = (question or '').casefold(), (answer or '').casefold()
+      documents[question_id] = (question, answer)
+      for gram in self.grams(question) | self.grams(answer):
+        postings[gram].append(question_id)
+    grams = {gram: array('q', ids) for gram, ids in postings.items()}
+    return time.monotonic() + self.ttl, documents, grams
+
+  def current(self):
+    with self.lock:
+      index = self.index
+    if index is None or time.monotonic() >= index[0]:
+      index = self.build()
+      with self.lock:
+        self.index = index
+    return index[1], index[2]
+
+  def invalidate(self):
+    with self.lock:
+      self.index = None
+
+  def candidates(self, documents, grams, term):
+    # ids of the questions holding the rarest trigram of the term, every
+    # question for terms too short to have one; search() checks each for
+    # the whole term, which is cheaper than intersecting the other postings
+    if len(term) < self.N:
+      return documents.keys()
+    rarest = ()
+    for gram in self.grams(term):
+      ids = grams.get(gram)
+      if ids is None:
+        return ()
+      if not rarest or len(ids) < len(rarest):
+        rarest = ids
+    return rarest
+
+  def search(self, term, limit):
+    # ids of the best limit questions matching term, best first
+    term = term.casefold()
+    documents, grams = self.current()
+    matches = []
+    for question_id in self.candidates(documents, grams, term):
+      question, answer = documents[question_id]
+      position = question.find(term)
+      if position >= 0:
+        matches.append((0, position, len(question), question_id))
+        continue
+      position = answer.find(term)
+      if position >= 0:
+        matches.append((1, position, len(answer), question_id))
+    return [match[-1] for match in heapq.nsmallest(limit, matches)]
@@ -38,6 +38,26 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertEqual(len(data['categories']), 6)
 
+    # test categories revalidated with their ETag
+    def test_get_categories_not_modified(self):
+        res = self.client().get('/categories')
+        self.assertIsNotNone(res.headers.get('ETag'))
+
+        res = self.client().get('/categories', headers={'If-None-Match': res.headers['ETag']})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.data, b'')
+
+    # test connection pool statistics
+    def test_get_pool_stats(self):
+        res = self.client().get('/pool/stats')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['pool']['pool'], 'QueuePool')
+        self.assertGreaterEqual(data['pool']['checkouts'], 1)
+        self.assertGreaterEqual(data['pool']['peak_checked_out'], 1)
+
     # test get all questions
     def test_get_questions(self):
         res = self.client().get('/questions')
@@ -50,6 +70,37 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(len(data['categories']), 6)
         self.assertIsNone(data['current_category'])
 
+    # test questions page size
+    def test_get_questions_per_page(self):
+        res = self.client().get('/questions?page=2&per_page=5')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(len(data['questions']), 5)
+        self.assertEqual(data['total_questions'], 19)
+        self.assertEqual(data['next_after_id'], data['questions'][-1]['id'])
+
+    # test questions pages continued after the last id seen
+    def test_get_questions_after_id(self):
+        first = json.loads(self.client().get('/questions?per_page=5').data)
+        second = json.loads(self.client().get('/questions?page=2&per_page=5').data)
+        res = self.client().get('/questions?per_page=5&after_id={}'.format(first['next_after_id']))
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['questions'], second['questions'])
+
+    # test last page of questions
+    def test_get_questions_last_page(self):
+        res = self.client().get('/questions?page=2')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(data['questions']), 9)
+        self.assertIsNone(data['next_after_id'])
+
     # test delete question fail
     def test_404_for_fail_delete(self):
         res = self.client().delete('/questions/1000')
@@ -132,6 +183,28 @@ class TriviaTestCase(unittest.TestCase):
         self.assertEqual(data['success'], True)
         self.assertEqual(len(data['questions']), 0)
         
+    # test search ranks question matches above answer matches
+    def test_query_questions_by_search_ranked(self):
+        res = self.client().post('/questions/search', json={'searchTerm': 'tom'})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['total_questions'], 2)
+        self.assertEqual([question['id'] for question in data['questions']], [2, 4])
+
+    # test search results paginated
+    def test_query_questions_by_search_paginated(self):
+        found = []
+        for page in (1, 2, 3):
+            res = self.client().post('/questions/search?page={}&per_page=1'.format(page), json={'searchTerm': 'soccer world cup'})
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(data['total_questions'], 2)
+            found.extend(question['id'] for question in data['questions'])
+
+        self.assertEqual(sorted(found), [10, 11])
+
     # test quiz bad category
     def test_422_quiz_bad_category(self):
         res = self.client().post('/quizzes', json={'previous_questions': [5,12,23,9], 'quiz_category': {'id': '1000'}})
@@ -159,6 +232,72 @@ class TriviaTestCase(unittest.TestCase):
         self.assertIsNotNone(data['question'])
 
 
+    # test quiz through a whole category without repeats
+    def test_quiz_whole_category(self):
+        previous_questions = []
+        while True:
+            res = self.client().post('/quizzes', json={'previous_questions': previous_questions, 'quiz_category': {'id': '4'}})
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            if data['question'] is None:
+                break
+            self.assertNotIn(data['question']['id'], previous_questions)
+            self.assertEqual(int(data['question']['category']), 4)
+            previous_questions.append(data['question']['id'])
+
+        self.assertEqual(len(previous_questions), 4)
+
+    # test quiz bad previous questions
+    def test_422_quiz_bad_previous_questions(self):
+        res = self.client().post('/quizzes', json={'previous_questions': ['x'], 'quiz_category': {'id': '4'}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['messages'], 'previous_questions is invalid')
+
+    # test a server-side quiz session through a whole category
+    def test_quiz_session(self):
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': {'id': '4'}})
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['success'], True)
+        self.assertEqual(data['total_questions'], 4)
+        session_id = data['session_id']
+
+        asked = []
+        while True:
+            res = self.client().post('/quizzes/sessions/{}/next'.format(session_id))
+            data = json.loads(res.data)
+            self.assertEqual(res.status_code, 200)
+            if data['question'] is None:
+                break
+            self.assertEqual(int(data['question']['category']), 4)
+            asked.append(data['question']['id'])
+        self.assertEqual(len(set(asked)), 4)
+
+        res = self.client().delete('/quizzes/sessions/{}'.format(session_id))
+        data = json.loads(res.data)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(data['asked'], 4)
+
+    # test unknown quiz session
+    def test_404_quiz_session_not_found(self):
+        res = self.client().post('/quizzes/sessions/unknown/next')
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(data['success'], False)
+        self.assertEqual(data['messages'], 'quiz session not found')
+
+    # test quiz session bad category
+    def test_422_quiz_session_bad_category(self):
+        res = self.client().post('/quizzes/sessions', json={'quiz_category': {'id': '1000'}})
+        data = json.loads(res.data)
+
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(data['messages'], 'quiz_category is invalid')
+
 
 # Make the tests conveniently executable
 if __name__ == "__main__":
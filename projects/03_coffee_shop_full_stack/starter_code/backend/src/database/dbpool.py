@@ -0,0 +1,38 @@
+import os
+
+# Connection pool settings of the app, read from the environment so that pools
+# can be sized per deployment (e.g. gunicorn workers x DB_POOL_SIZE +
+# DB_MAX_OVERFLOW must stay below the server's max_connections):
+#
+#   DB_POOL_SIZE            connections kept open per process (5)
+#   DB_MAX_OVERFLOW         extra connections allowed under load (10)
+#   DB_POOL_TIMEOUT         seconds to wait for a free connection (30)
+#   DB_POOL_RECYCLE         seconds before a connection is replaced (1800)
+#   DB_POOL_PRE_PING        test connections on checkout (true)
+#   DB_STATEMENT_TIMEOUT_MS PostgreSQL statement_timeout, 0 disables it (0)
+#
+# Each project is deployed on its own and carries its own copy of this module;
+# keep env_flag() and engine_options() in step with the fyyur and trivia
+# dbpool.py, which add the pool instrumentation on top.
+
+
+def env_flag(name, default, environ=os.environ):
+    return environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def engine_options(database_uri, environ=os.environ):
+    # SQLALCHEMY_ENGINE_OPTIONS for the given database; SQLite keeps the
+    # defaults Flask-SQLAlchemy picks for it
+    if database_uri.startswith('sqlite'):
+        return {}
+    options = {
+        'pool_size': int(environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_flag('DB_POOL_PRE_PING', 'true', environ),
+    }
+    statement_timeout = int(environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    if statement_timeout and database_uri.startswith('postgres'):
+        options['connect_args'] = {'options': '-c statement_timeout={}'.format(statement_timeout)}
+    return options